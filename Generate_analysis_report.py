@@ -10,7 +10,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils.file_handler import read_sales_data, parse_transactions, validate_and_filter
+from utils.file_handler import load_transactions, validate_and_filter
 from utils.data_processor import (
     calculate_total_revenue,
     region_wise_sales,
@@ -31,16 +31,12 @@ def generate_comprehensive_report():
     print("=" * 80)
     print("\nLoading and processing data...")
     
-    raw_lines = read_sales_data('data/sales_data.txt')
-    
-    if not raw_lines:
-        print("ERROR: Could not read data file")
-        return None
-    
-    transactions = parse_transactions(raw_lines)
+    # Parsed rows are cached, so an unchanged data file is not re-parsed;
+    # the table form is validated and analyzed without per-row dicts
+    transactions = load_transactions('data/sales_data.txt', as_table=True)
     
     if not transactions:
-        print("ERROR: Could not parse transactions")
+        print("ERROR: Could not read or parse data file")
         return None
     
     valid_transactions, invalid_count, summary = validate_and_filter(transactions)
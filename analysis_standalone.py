@@ -1,9 +1,25 @@
 """
 Standalone analysis - all functions in one file
+
+The analysis functions accept a list of transaction dictionaries, a
+columnar TransactionTable, or a SalesAggregates built once and shared
+across all report sections.
 """
 
 from datetime import datetime
 import os
+import sys
+
+from utils.transaction_table import TransactionTable
+from utils.sales_aggregates import SalesAggregates, sales_aggregates, refresh_aggregates
+
+
+# Columns each analysis reads when given raw transactions
+PRODUCT_COLUMNS = ['ProductName', 'Quantity', 'UnitPrice']
+CUSTOMER_COLUMNS = ['CustomerID', 'ProductName', 'Quantity', 'UnitPrice']
+SPEND_COLUMNS = ['CustomerID', 'Quantity', 'UnitPrice']
+DAILY_COLUMNS = ['Date', 'CustomerID', 'Quantity', 'UnitPrice']
+REPORT_COLUMNS = ['Date', 'ProductName', 'Quantity', 'UnitPrice', 'CustomerID', 'Region']
 
 # ============================================================================
 # DATA LOADING FUNCTIONS
@@ -80,83 +96,27 @@ def validate_transactions(transactions):
 
 def calculate_total_revenue(transactions):
     """Calculate total revenue"""
-    total = 0.0
-    for t in transactions:
-        total += t['Quantity'] * t['UnitPrice']
-    return total
+    return sales_aggregates(transactions, ['Quantity', 'UnitPrice']).total_revenue()
 
 
 def region_wise_sales(transactions):
     """Analyze sales by region"""
-    region_data = {}
-    
-    for t in transactions:
-        region = t['Region']
-        revenue = t['Quantity'] * t['UnitPrice']
-        
-        if region not in region_data:
-            region_data[region] = {'total_sales': 0.0, 'transaction_count': 0}
-        
-        region_data[region]['total_sales'] += revenue
-        region_data[region]['transaction_count'] += 1
-    
-    grand_total = sum(d['total_sales'] for d in region_data.values())
-    
-    for region in region_data:
-        pct = (region_data[region]['total_sales'] / grand_total * 100) if grand_total > 0 else 0
-        region_data[region]['percentage'] = round(pct, 2)
-    
-    return dict(sorted(region_data.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+    return sales_aggregates(transactions, ['Region', 'Quantity', 'UnitPrice']).region_wise_sales()
 
 
 def top_selling_products(transactions, n=5):
     """Find top n products by quantity"""
-    product_data = {}
-    
-    for t in transactions:
-        product = t['ProductName']
-        qty = t['Quantity']
-        revenue = t['Quantity'] * t['UnitPrice']
-        
-        if product not in product_data:
-            product_data[product] = {'total_quantity': 0, 'total_revenue': 0.0}
-        
-        product_data[product]['total_quantity'] += qty
-        product_data[product]['total_revenue'] += revenue
-    
-    product_list = [(p, d['total_quantity'], d['total_revenue']) for p, d in product_data.items()]
-    product_list.sort(key=lambda x: x[1], reverse=True)
-    
-    return product_list[:n]
+    return sales_aggregates(transactions, PRODUCT_COLUMNS).top_selling_products(n)
 
 
 def customer_analysis(transactions):
     """Analyze customer purchase patterns"""
-    customer_data = {}
-    
-    for t in transactions:
-        cust = t['CustomerID']
-        amount = t['Quantity'] * t['UnitPrice']
-        product = t['ProductName']
-        
-        if cust not in customer_data:
-            customer_data[cust] = {
-                'total_spent': 0.0,
-                'purchase_count': 0,
-                'products_bought': set()
-            }
-        
-        customer_data[cust]['total_spent'] += amount
-        customer_data[cust]['purchase_count'] += 1
-        customer_data[cust]['products_bought'].add(product)
-    
-    for cust in customer_data:
-        total = customer_data[cust]['total_spent']
-        count = customer_data[cust]['purchase_count']
-        customer_data[cust]['avg_order_value'] = round(total / count, 2) if count > 0 else 0.0
-        customer_data[cust]['products_bought'] = sorted(list(customer_data[cust]['products_bought']))
-    
-    return dict(sorted(customer_data.items(), key=lambda x: x[1]['total_spent'], reverse=True))
+    return sales_aggregates(transactions, CUSTOMER_COLUMNS).customer_analysis()
+
+
+def top_customers(transactions, n=5):
+    """Find top n customers by total spend as (customer, total_spent) pairs"""
+    return sales_aggregates(transactions, SPEND_COLUMNS).top_customers(n)
 
 
 # ============================================================================
@@ -165,88 +125,54 @@ def customer_analysis(transactions):
 
 def daily_sales_trend(transactions):
     """Analyze daily sales trends"""
-    daily_data = {}
-    
-    for t in transactions:
-        date = t['Date']
-        revenue = t['Quantity'] * t['UnitPrice']
-        customer = t['CustomerID']
-        
-        if date not in daily_data:
-            daily_data[date] = {
-                'revenue': 0.0,
-                'transaction_count': 0,
-                'customers': set()
-            }
-        
-        daily_data[date]['revenue'] += revenue
-        daily_data[date]['transaction_count'] += 1
-        daily_data[date]['customers'].add(customer)
-    
-    result = {}
-    for date, data in daily_data.items():
-        result[date] = {
-            'revenue': round(data['revenue'], 2),
-            'transaction_count': data['transaction_count'],
-            'unique_customers': len(data['customers'])
-        }
-    
-    return dict(sorted(result.items()))
+    return sales_aggregates(transactions, DAILY_COLUMNS).daily_sales_trend()
 
 
 def find_peak_sales_day(transactions):
     """Find day with highest revenue"""
-    daily_trend = daily_sales_trend(transactions)
-    
-    if not daily_trend:
-        return (None, 0.0, 0)
-    
-    peak_date = max(daily_trend.items(), key=lambda x: x[1]['revenue'])
-    return (peak_date[0], peak_date[1]['revenue'], peak_date[1]['transaction_count'])
+    return sales_aggregates(transactions, DAILY_COLUMNS).find_peak_sales_day()
 
 
 # ============================================================================
 # TASK 2.3: PRODUCT PERFORMANCE
 # ============================================================================
 
-def low_performing_products(transactions, threshold=10):
-    """Find products with low sales"""
-    product_data = {}
-    
-    for t in transactions:
-        product = t['ProductName']
-        qty = t['Quantity']
-        revenue = t['Quantity'] * t['UnitPrice']
-        
-        if product not in product_data:
-            product_data[product] = {'total_quantity': 0, 'total_revenue': 0.0}
-        
-        product_data[product]['total_quantity'] += qty
-        product_data[product]['total_revenue'] += revenue
-    
-    low_performers = [
-        (p, d['total_quantity'], d['total_revenue'])
-        for p, d in product_data.items()
-        if d['total_quantity'] < threshold
-    ]
-    
-    low_performers.sort(key=lambda x: x[1])
-    return low_performers
+def low_performing_products(transactions, threshold=10, n=None):
+    """Find products with low sales (only the n lowest when n is given)"""
+    return sales_aggregates(transactions, PRODUCT_COLUMNS).low_performing_products(threshold, n)
 
 
 # ============================================================================
 # MAIN REPORT GENERATION
 # ============================================================================
 
-def generate_report():
-    """Generate comprehensive report"""
+def generate_report(state_file=None):
+    """
+    Generate comprehensive report
+    
+    With state_file, totals saved by the previous run are reused and only
+    transactions appended to the data file since then are processed.
+    """
     
     print("Loading data...")
-    raw_lines = read_sales_data('data/sales_data.txt')
-    transactions = parse_transactions(raw_lines)
-    valid_transactions = validate_transactions(transactions)
+    if state_file:
+        aggregates = refresh_aggregates(
+            'data/sales_data.txt',
+            state_file,
+            validate=lambda table: TransactionTable.from_record_list(
+                validate_transactions(table), REPORT_COLUMNS)
+        )
+    else:
+        # The raw lines are dropped as soon as they are parsed
+        transactions = parse_transactions(read_sales_data('data/sales_data.txt'))
+        valid_transactions = TransactionTable.from_record_list(
+            validate_transactions(transactions), REPORT_COLUMNS)
+        
+        # One aggregation pass feeds every section below
+        aggregates = SalesAggregates(valid_transactions)
     
-    print(f"Loaded {len(valid_transactions)} valid transactions\n")
+    valid_count = aggregates.total[1]
+    print(f"Loaded {valid_count} valid transactions\n")
     
     # Generate report
     report = []
@@ -254,44 +180,43 @@ def generate_report():
     report.append("COMPREHENSIVE SALES ANALYSIS REPORT")
     report.append("=" * 80)
     report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append(f"Valid Transactions: {len(valid_transactions)}")
+    report.append(f"Valid Transactions: {valid_count}")
     report.append("")
     
     # Revenue
-    total_rev = calculate_total_revenue(valid_transactions)
+    total_rev = calculate_total_revenue(aggregates)
     report.append("1. TOTAL REVENUE")
     report.append(f"   ${total_rev:,.2f}")
     report.append("")
     
     # Regions
-    regions = region_wise_sales(valid_transactions)
+    regions = region_wise_sales(aggregates)
     report.append("2. REGIONAL SALES")
     for region, data in regions.items():
         report.append(f"   {region}: ${data['total_sales']:,.2f} ({data['percentage']}%)")
     report.append("")
     
     # Top Products
-    top_prods = top_selling_products(valid_transactions, n=5)
+    top_prods = top_selling_products(aggregates, n=5)
     report.append("3. TOP 5 PRODUCTS")
     for i, (prod, qty, rev) in enumerate(top_prods, 1):
         report.append(f"   {i}. {prod}: {qty} units, ${rev:,.2f}")
     report.append("")
     
     # Top Customers
-    customers = customer_analysis(valid_transactions)
     report.append("4. TOP 5 CUSTOMERS")
-    for i, (cust, data) in enumerate(list(customers.items())[:5], 1):
-        report.append(f"   {i}. {cust}: ${data['total_spent']:,.2f}")
+    for i, (cust, spent) in enumerate(top_customers(aggregates, n=5), 1):
+        report.append(f"   {i}. {cust}: ${spent:,.2f}")
     report.append("")
     
     # Peak Day
-    peak_date, peak_rev, peak_count = find_peak_sales_day(valid_transactions)
+    peak_date, peak_rev, peak_count = find_peak_sales_day(aggregates)
     report.append("5. PEAK SALES DAY")
     report.append(f"   {peak_date}: ${peak_rev:,.2f} ({peak_count} transactions)")
     report.append("")
     
     # Low Performers
-    low_prods = low_performing_products(valid_transactions, threshold=10)
+    low_prods = low_performing_products(aggregates, threshold=10)
     report.append("6. LOW PERFORMING PRODUCTS (< 10 units)")
     for prod, qty, rev in low_prods:
         report.append(f"   {prod}: {qty} units, ${rev:,.2f}")
@@ -311,5 +236,6 @@ def generate_report():
 
 
 if __name__ == "__main__":
-    generate_report()
+    # --incremental keeps running totals in output/analysis_state.json
+    generate_report('output/analysis_state.json' if '--incremental' in sys.argv else None)
     
\ No newline at end of file
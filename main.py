@@ -3,7 +3,6 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 
-import pandas as pd
 import numpy as np
 from datetime import datetime
 
@@ -12,26 +11,36 @@ from utils.file_handler import (
     read_sales_data,
     write_report,
     save_cleaned_data,
-    parse_transactions,
+    load_transactions,
+    COLUMNAR_EXTENSION,
     validate_and_filter
 )
 
 from utils.data_processor import (
     validate_and_clean,
+    convert_revenue,
+    revenue_breakdown,
     analyze_sales
 )
 
 from utils.api_handler import (
-    fetch_all_products,
+    load_product_catalog,
+    wait_for_catalog_refresh,
     create_product_mapping,
     enrich_sales_data,
-    fetch_exchange_rates
+    ENRICHED_DATA_FILE,
+    BASE_CURRENCY,
+    fetch_exchange_rates,
+    get_exchange_rates
 )
 
 from utils.report_generator import generate_sales_report
 
 
-def generate_summary_report(analysis, invalid_count, rates):
+CURRENCY_SYMBOLS = {'EUR': '€', 'GBP': '£', 'INR': '₹'}
+
+
+def generate_summary_report(analysis, invalid_count, rates, converted_df=None):
     report = []
     report.append("=" * 75)
     report.append("SALES DATA ANALYTICS REPORT")
@@ -50,10 +59,26 @@ def generate_summary_report(analysis, invalid_count, rates):
         report.append("REVENUE (MULTI-CURRENCY)")
         report.append("-" * 75)
         rev = analysis['total_revenue']
+        converted = {currency: rev * rates[currency] for currency in CURRENCY_SYMBOLS}
+
+        # Each transaction converted at its own date's rate, when available
+        if converted_df is not None:
+            converted = {currency: converted_df[f'TotalPrice_{currency}'].sum()
+                         for currency in CURRENCY_SYMBOLS}
+
         report.append(f"USD: ${rev:,.2f}")
-        report.append(f"EUR: €{rev * rates['EUR']:,.2f}")
-        report.append(f"GBP: £{rev * rates['GBP']:,.2f}")
-        report.append(f"INR: ₹{rev * rates['INR']:,.2f}")
+        for currency, symbol in CURRENCY_SYMBOLS.items():
+            report.append(f"{currency}: {symbol}{converted[currency]:,.2f}")
+        report.append("")
+
+    if converted_df is not None:
+        report.append("REGION-WISE REVENUE (MULTI-CURRENCY)")
+        report.append("-" * 75)
+        currencies = list(CURRENCY_SYMBOLS)
+        report.append(f"{'Region':15s}" + "".join(f"{c:>15s}" for c in [BASE_CURRENCY] + currencies))
+        breakdown = revenue_breakdown(converted_df, 'Region', currencies, BASE_CURRENCY)
+        for region, row in breakdown.iterrows():
+            report.append(f"{region:15s}" + "".join(f"{value:>15,.2f}" for value in row))
         report.append("")
 
     report.append("REGION-WISE PERFORMANCE")
@@ -81,8 +106,9 @@ def generate_invalid_report(invalid_df):
 def main_task1_pipeline():
     print("Running Task 1 pipeline (parsing & validation only)")
 
-    raw_lines = read_sales_data("data/sales_data.txt")
-    transactions = parse_transactions(raw_lines)
+    # A TransactionTable skips rebuilding dicts from the cache and is
+    # validated with column masks directly
+    transactions = load_transactions("data/sales_data.txt", as_table=True)
     valid_txns, invalid_count, _ = validate_and_filter(transactions)
 
     print(f"Valid: {len(valid_txns)}, Invalid: {invalid_count}")
@@ -105,19 +131,23 @@ def main():
         print("No valid records.")
         return
 
-    # STEP 3: API – Fetch products
-    api_products = fetch_all_products()
+    # STEP 3: API – Fetch products (served from the local catalog cache when fresh)
+    api_products = load_product_catalog()
     product_mapping = create_product_mapping(api_products)
 
-    # STEP 4: API – Enrich sales data
-    enriched_transactions = enrich_sales_data(
-        valid_df.to_dict(orient="records"),
-        product_mapping
+    # STEP 4: API – Enrich sales data (one join per distinct ProductID),
+    # saved as text plus a binary columnar copy for fast reloads
+    enriched_df = enrich_sales_data(
+        valid_df,
+        product_mapping,
+        [ENRICHED_DATA_FILE, os.path.splitext(ENRICHED_DATA_FILE)[0] + COLUMNAR_EXTENSION]
     )
-    enriched_df = pd.DataFrame(enriched_transactions)
+    enriched_transactions = enriched_df.to_dict(orient="records")
 
-    # STEP 5: API – Exchange rates
+    # STEP 5: API – Exchange rates (latest, plus each transaction date's rate)
     rates = fetch_exchange_rates()
+    date_rates = get_exchange_rates(enriched_df['Date'].dropna().unique(), list(CURRENCY_SYMBOLS))
+    converted_df = convert_revenue(enriched_df, date_rates, list(CURRENCY_SYMBOLS))
 
     # STEP 6: Analysis
     analysis = analyze_sales(enriched_df)
@@ -128,7 +158,8 @@ def main():
     summary_report = generate_summary_report(
         analysis,
         len(invalid_df),
-        rates
+        rates,
+        converted_df
     )
     write_report("output/sales_summary_report.txt", summary_report)
 
@@ -140,8 +171,18 @@ def main():
         enriched_transactions
     )
 
-    save_cleaned_data("output/cleaned_sales_data.txt", enriched_df)
-    enriched_df.to_csv("output/cleaned_sales_data.csv", index=False)
+    # Pipe-delimited and CSV copies from one formatting pass, plus a columnar copy
+    save_cleaned_data(
+        [
+            "output/cleaned_sales_data.txt",
+            "output/cleaned_sales_data.csv",
+            "output/cleaned_sales_data" + COLUMNAR_EXTENSION
+        ],
+        enriched_df
+    )
+
+    # Let a background catalog refresh finish writing the cache
+    wait_for_catalog_refresh()
 
     print("Processing complete!")
 
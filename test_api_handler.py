@@ -0,0 +1,409 @@
+"""
+Tests for utils/api_handler.py against a local stand-in HTTP server
+"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from utils.api_handler import (
+    categorize_product,
+    enrich_with_categories,
+    enrich_sales_data,
+    fetch_all_products,
+    load_category_rules,
+    fetch_exchange_rates,
+    get_exchange_rates,
+    load_product_catalog,
+    wait_for_catalog_refresh
+)
+from utils.category_matcher import KeywordMatcher
+
+CATALOG = [
+    {"id": i, "title": f"Product {i}", "category": "laptops" if i % 2 else "audio",
+     "brand": f"Brand {i % 7}", "price": i * 10.0, "rating": 4.5}
+    for i in range(1, 251)
+]
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """Serves CATALOG like dummyjson's /products, failing the first request of each page once"""
+
+    failed_skips = set()
+    requests_seen = []
+    max_limit = 1000
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        limit = min(int(query.get("limit", ["30"])[0]), self.max_limit)
+        skip = int(query.get("skip", ["0"])[0])
+        self.requests_seen.append(skip)
+
+        if skip not in self.failed_skips:
+            self.failed_skips.add(skip)
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps({
+            "products": CATALOG[skip:skip + limit],
+            "total": len(CATALOG),
+            "skip": skip,
+            "limit": limit
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/products"
+
+
+def test_fetch_all_products_paginated():
+    """All pages are fetched concurrently, with retries for transient errors"""
+    print("\n" + "="*70)
+    print("TEST: Paginated product fetch")
+    print("="*70)
+
+    CatalogHandler.failed_skips = set()
+    CatalogHandler.requests_seen = []
+    server, url = start_server(CatalogHandler)
+    try:
+        products = fetch_all_products(url=url, page_size=40, max_workers=4, backoff=0.01)
+    finally:
+        server.shutdown()
+
+    assert len(products) == 250, f"Should fetch the whole catalog, got {len(products)}"
+    assert [p["id"] for p in products] == list(range(1, 251)), "Pages should be merged in order"
+    assert set(products[0]) == {"id", "title", "category", "brand", "price", "rating"}, \
+        "Products should keep the same fields"
+    assert len(CatalogHandler.requests_seen) == 14, "Each of 7 pages should be retried once"
+
+    # A server that caps the page size below the requested limit
+    CatalogHandler.failed_skips = set(range(0, 250, 30))
+    CatalogHandler.max_limit = 30
+    server, url = start_server(CatalogHandler)
+    try:
+        capped = fetch_all_products(url=url, page_size=40, max_workers=4, backoff=0.01)
+    finally:
+        CatalogHandler.max_limit = 1000
+        server.shutdown()
+
+    assert [p["id"] for p in capped] == list(range(1, 251)), "Capped pages should not leave gaps"
+
+    print("✓ Paginated product fetch PASSED")
+
+
+def test_fetch_all_products_unreachable():
+    """An unreachable API still returns an empty catalog"""
+    print("\n" + "="*70)
+    print("TEST: Unreachable product API")
+    print("="*70)
+
+    products = fetch_all_products(url="http://127.0.0.1:9/products", retries=1, backoff=0.01)
+    assert products == [], "Unreachable API should give an empty list"
+
+    print("✓ Unreachable product API PASSED")
+
+
+class VersionedCatalogHandler(BaseHTTPRequestHandler):
+    """Serves a paged catalog with a per-page ETag and answers 304 when it matches"""
+
+    products = CATALOG[:60]
+    statuses = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get("limit", ["30"])[0])
+        skip = int(query.get("skip", ["0"])[0])
+        body = json.dumps({"products": self.products[skip:skip + limit],
+                           "total": len(self.products)}).encode("utf-8")
+        etag = f'"{hash(body)}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def age_cache(cache_file, seconds):
+    with open(cache_file, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    cache["fetched_at"] -= seconds
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+
+def test_load_product_catalog_cache(tmp_path):
+    """Catalog cache honours TTL, ETag revalidation, background refresh and offline fallback"""
+    print("\n" + "="*70)
+    print("TEST: Product catalog cache")
+    print("="*70)
+
+    cache_file = os.path.join(tmp_path, "catalog.json")
+    VersionedCatalogHandler.products = [dict(product) for product in CATALOG[:60]]
+    VersionedCatalogHandler.statuses = statuses = []
+    server, url = start_server(VersionedCatalogHandler)
+    options = {"cache_file": cache_file, "url": url, "ttl": 60, "stale_while_revalidate": 60,
+               "page_size": 30}
+    # Revalidation sends both pages with validators plus one request past the end
+    unchanged = [200, 304, 304]
+
+    try:
+        first = load_product_catalog(**options)
+        assert len(first) == 60 and statuses == [200, 200], "First load should download both pages"
+
+        assert load_product_catalog(**options) == first, "Fresh cache should be reused"
+        assert statuses == [200, 200], "Fresh cache should not hit the API"
+
+        age_cache(cache_file, 90)
+        assert load_product_catalog(**options) == first, "Stale cache should be returned at once"
+        wait_for_catalog_refresh(timeout=5)
+        assert sorted(statuses[2:]) == unchanged, "Stale cache should revalidate in background"
+
+        age_cache(cache_file, 500)
+        assert load_product_catalog(**options) == first, "Expired cache should revalidate first"
+        assert sorted(statuses[5:]) == unchanged, "Unchanged catalog should cost a 304 per page"
+
+        # A change on the second page must be noticed although page one is unchanged
+        VersionedCatalogHandler.products[45]["title"] = "Renamed"
+        age_cache(cache_file, 500)
+        changed = load_product_catalog(**options)
+        assert changed[45]["title"] == "Renamed", "A change on a later page should refetch the catalog"
+
+        # Products appended after a full last page only show up past the end
+        VersionedCatalogHandler.products.append(dict(CATALOG[60]))
+        age_cache(cache_file, 500)
+        latest = load_product_catalog(**options)
+        assert len(latest) == 61, "Appended products should be fetched"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    age_cache(cache_file, 500)
+    offline = load_product_catalog(**dict(options, retries=0))
+    assert offline == latest, "Unreachable API should fall back to the cached catalog"
+
+    print("✓ Product catalog cache PASSED")
+
+
+class RateHandler(BaseHTTPRequestHandler):
+    """Serves /latest/USD like exchangerate-api and /{start}..{end} like frankfurter"""
+
+    # Business-day quotes only; 2024-12-07/08 is a weekend
+    QUOTES = {
+        "2024-11-29": {"EUR": 0.94, "GBP": 0.78, "INR": 84.5},
+        "2024-12-02": {"EUR": 0.95, "GBP": 0.79, "INR": 84.7},
+        "2024-12-06": {"EUR": 0.96, "GBP": 0.80, "INR": 84.9},
+        "2024-12-09": {"EUR": 0.97, "GBP": 0.81, "INR": 85.0},
+    }
+    paths = []
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.paths.append(path)
+
+        if path.endswith("/latest/USD"):
+            body = {"date": "2024-12-09", "rates": self.QUOTES["2024-12-09"]}
+        else:
+            start, end = path.rsplit("/", 1)[1].split("..")
+            wanted = parse_qs(urlparse(self.path).query)["to"][0].split(",")
+            body = {"rates": {d: {c: r[c] for c in wanted}
+                              for d, r in self.QUOTES.items() if start <= d <= end}}
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_exchange_rate_store(tmp_path):
+    """Latest and per-date rates come from the store after the first fetch"""
+    print("\n" + "="*70)
+    print("TEST: Exchange-rate store")
+    print("="*70)
+
+    store_file = os.path.join(tmp_path, "rates.json")
+    RateHandler.paths = []
+    server, url = start_server(RateHandler)
+    base = url.rsplit("/", 1)[0]
+
+    try:
+        latest = fetch_exchange_rates(store_file=store_file, url=f"{base}/latest/USD")
+        assert latest == {"EUR": 0.97, "GBP": 0.81, "INR": 85.0, "date": "2024-12-09"}, \
+            "Latest rates should keep the original format"
+        assert fetch_exchange_rates(store_file=store_file, url=f"{base}/latest/USD") == latest, \
+            "Fresh latest rates should be reused"
+        assert len(RateHandler.paths) == 1, "Reused latest rates should not hit the API"
+
+        dates = ["2024-12-02", "2024-12-07", "2024-12-01 00:00:00", "2024-12-06"]
+        get_exchange_rates(dates, currencies=["GBP"], store_file=store_file, url=base)
+        rates = get_exchange_rates(dates, store_file=store_file, url=base)
+        assert len(RateHandler.paths) == 3, "Missing dates should be fetched in one request"
+
+        # Nothing is quoted after 2024-12-09 yet, so 2024-12-10 is asked for again
+        assert get_exchange_rates(["2024-12-10"], store_file=store_file, url=base)["2024-12-10"]["EUR"] == 0.97
+        get_exchange_rates(["2024-12-10"], store_file=store_file, url=base)
+        assert len(RateHandler.paths) == 5, "Unpublished dates should not be stored as quotes"
+
+        # Missing and non-ISO dates are skipped rather than crashing the lookup
+        mixed = get_exchange_rates([pd.NaT, None, "2024/12/01", pd.Timestamp("2024-12-06")],
+                                   store_file=store_file, url=base)
+        assert mixed == {"2024-12-06": rates["2024-12-06"]}, "Only valid dates should get rates"
+        assert get_exchange_rates(pd.Series([pd.NaT]), store_file=store_file, url=base) == {}
+        assert len(RateHandler.paths) == 5, "Stored dates should not be fetched again"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert rates["2024-12-02"]["EUR"] == 0.95, "Quoted day should use its own rate"
+    assert rates["2024-12-07"]["EUR"] == 0.96, "Weekend should carry Friday's rate forward"
+    assert rates["2024-12-01"]["INR"] == 84.5, "Sunday should use the quote before the fetched range"
+
+    with open(store_file, "r", encoding="utf-8") as f:
+        stored = json.load(f)
+    assert "2024-12-07" not in stored["daily"] and "2024-12-07" in stored["no_quote"], \
+        "Carried-forward rates should not be stored as quotes"
+    assert "2024-12-10" not in stored["daily"] and "2024-12-10" not in stored["no_quote"]
+    assert stored["daily"]["2024-12-02"] == RateHandler.QUOTES["2024-12-02"], \
+        "Rates fetched for other currencies should be kept"
+
+    # A fresh process with the server gone reads everything from disk
+    from utils import api_handler
+    api_handler._rate_stores.clear()
+    assert get_exchange_rates(dates, store_file=store_file, url=base) == rates, \
+        "Stored dates should be served without the API"
+    assert get_exchange_rates(["2024-12-20"], store_file=store_file, url=base)["2024-12-20"]["GBP"] == 0.81, \
+        "Unreachable API should fall back to the closest earlier rate"
+
+    print("✓ Exchange-rate store PASSED")
+
+
+def test_categorize_product():
+    """Compiled keyword matching keeps the rule priority of the if/elif chain"""
+    print("\n" + "="*70)
+    print("TEST: Product categorization")
+    print("="*70)
+
+    assert categorize_product("Laptop Pro 15") == "Computers", "Laptop should be a computer"
+    assert categorize_product("USB-C Cable") == "Accessories", "Cable should be an accessory"
+    assert categorize_product("External Hard Drive") == "Storage Devices", "Phrase keywords should match"
+    assert categorize_product("Mouse Pad for Laptop") == "Computers", "Earlier rule should win anywhere in the name"
+    assert categorize_product("Smart Watch") == "Electronics", "Unmatched names get the default"
+    assert categorize_product(None) == "Electronics", "Missing names get the default"
+
+    # Overlapping keywords: 'phone' inside 'headphone', suffix 'ushers' reaching 'she'
+    matcher = KeywordMatcher([("she", "A"), ("headphone", "B"), ("phone", "C"), ("hers", "D")], "Z")
+    assert matcher.match("Headphones") == "B", "Longer keyword should be found"
+    assert matcher.match("Telephone") == "C", "Keyword inside a longer prefix should be found"
+    assert matcher.match("ushers") == "A", "Overlapping matches should all be seen"
+
+    df = pd.DataFrame({"ProductName": ["Laptop", "Wireless Mouse", "Laptop", None, "Webcam"]})
+    enriched = enrich_with_categories(df)
+    assert list(enriched["Category"]) == \
+        ["Computers", "Peripherals", "Computers", "Electronics", "Display Devices"], \
+        "Categories should be broadcast to every row"
+
+    print("✓ Product categorization PASSED")
+
+
+def test_category_rules_file(tmp_path):
+    """Rules loaded from a file honour priority, exact names and the default"""
+    print("\n" + "="*70)
+    print("TEST: Category rules file")
+    print("="*70)
+
+    rules_file = os.path.join(tmp_path, "rules.txt")
+    with open(rules_file, "w", encoding="utf-8") as f:
+        f.write("Priority|MatchType|Pattern|Category\n")
+        f.write("# comment\n")
+        f.write("20|keyword|laptop|Computers\n")
+        f.write("10|keyword|charger|Power\n")
+        f.write("5|exact| Laptop Sleeve |Bags\n")
+        f.write("15|exact|USB Charger|Cables\n")
+        f.write("7|fuzzy|mouse|Peripherals\n")
+        f.write("99|default||Other\n")
+        f.write("100|default||Misc\n")
+
+    try:
+        rules = load_category_rules(rules_file)
+        assert rules.rule_count == 4, "Invalid match types and defaults should not be counted"
+        assert categorize_product("Laptop Charger") == "Power", "Lower priority number should win"
+        assert categorize_product("laptop sleeve") == "Bags", "Exact rules should match case-insensitively"
+        assert categorize_product("Laptop Sleeve XL") == "Computers", "Exact rules need the whole name"
+        assert categorize_product("USB Charger") == "Power", "A higher-priority keyword should beat an exact rule"
+        assert categorize_product("Mouse") == "Other", "Unmatched names get the lowest-numbered default"
+    finally:
+        load_category_rules()
+
+    assert categorize_product("Laptop Charger") == "Computers", "Shipped rules should match the original chain"
+
+    print("✓ Category rules file PASSED")
+
+
+def test_enrich_sales_data(tmp_path, monkeypatch):
+    """The ProductID join gives the same enrichment for DataFrames and dicts"""
+    print("\n" + "="*70)
+    print("TEST: Sales data enrichment")
+    print("="*70)
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    mapping = {101: {"title": "Laptop", "category": "laptops", "brand": "Acme", "rating": 4.5},
+               102: {"title": "Mouse", "category": "accessories", "brand": "Point", "rating": 4.1}}
+    transactions = [
+        {"TransactionID": "T001", "Date": "2024-12-01", "ProductID": "P101", "ProductName": "Laptop",
+         "Quantity": 1, "UnitPrice": 45000.0, "CustomerID": "C001", "Region": "North"},
+        {"TransactionID": "T002", "Date": "2024-12-01", "ProductID": "P999", "ProductName": "Cable",
+         "Quantity": 2, "UnitPrice": 150.0, "CustomerID": "C002", "Region": "South"},
+        {"TransactionID": "T003", "Date": "2024-12-02", "ProductID": "PX", "ProductName": "Webcam",
+         "Quantity": 1, "UnitPrice": 900.0, "CustomerID": "C001", "Region": "East"},
+        {"TransactionID": "T004", "Date": "2024-12-02", "ProductID": "P101", "ProductName": "Laptop",
+         "Quantity": 2, "UnitPrice": 44000.0, "CustomerID": "C003", "Region": "West"},
+    ]
+
+    records = enrich_sales_data(transactions, mapping)
+    with open("data/enriched_sales_data.txt", encoding="utf-8") as f:
+        records_file = f.read()
+
+    assert records[0]["API_Brand"] == "Acme" and records[3]["API_Rating"] == 4.5, "Matches should be joined"
+    assert [r["API_Match"] for r in records] == [True, False, False, True], "Unknown ids should not match"
+    assert records[2]["API_Category"] is None, "Unparseable ids should get empty API fields"
+    assert "API_Match" not in transactions[0], "Input dicts should not be modified"
+
+    frame = enrich_sales_data(pd.DataFrame(transactions), mapping)
+    with open("data/enriched_sales_data.txt", encoding="utf-8") as f:
+        frame_file = f.read()
+
+    pd.testing.assert_frame_equal(frame, pd.DataFrame(records))
+    assert frame_file == records_file, "Both inputs should save the same file"
+    assert "P999|Cable|2|150.0|C002|South||||False" in frame_file, "Unmatched API fields should be empty"
+
+    print("✓ Sales data enrichment PASSED")
@@ -0,0 +1,193 @@
+"""
+Tests for the pandas cleaning and analysis stages in utils/data_processor.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processor import (
+    analyze_sales,
+    analyze_sales_stream,
+    clean_numeric_column,
+    convert_revenue,
+    revenue_breakdown,
+    validate_and_clean
+)
+from utils.file_handler import read_sales_data, read_sales_data_frames
+
+
+def test_convert_revenue():
+    """Every row is converted at its own date's rate, for every currency at once"""
+    print("\n" + "="*70)
+    print("TEST: Multi-currency revenue conversion")
+    print("="*70)
+
+    df = pd.DataFrame({
+        'Date': ['2024-12-01', '2024-12-02', '2024-12-01', '2024-12-03'],
+        'Region': ['North', 'South', 'South', 'North'],
+        'TotalPrice': [100.0, 200.0, 50.0, 10.0]
+    })
+    date_rates = {
+        '2024-12-01': {'EUR': 0.9, 'INR': 80.0},
+        '2024-12-02': {'EUR': 0.8, 'INR': 82.0},
+        '2024-12-03': {'EUR': 1.0, 'INR': 84.0}
+    }
+
+    converted = convert_revenue(df, date_rates, ['EUR', 'INR'])
+    assert list(converted.columns[:3]) == list(df.columns), "Original columns should be kept"
+    assert np.allclose(converted['TotalPrice_EUR'], [90.0, 160.0, 45.0, 10.0]), "EUR should use row dates"
+    assert np.allclose(converted['TotalPrice_INR'], [8000.0, 16400.0, 4000.0, 840.0]), "INR should use row dates"
+    assert 'TotalPrice_EUR' not in df.columns, "Input frame should not be modified"
+
+    breakdown = revenue_breakdown(converted, 'Region', ['EUR', 'INR'], 'USD')
+    assert list(breakdown.columns) == ['USD', 'EUR', 'INR'], "One column per currency"
+    assert list(breakdown.index) == ['South', 'North'], "Regions should be ordered by revenue"
+    assert np.isclose(breakdown.loc['South', 'EUR'], 205.0), "Group sums should use converted rows"
+
+    # Dates without a rate carry the closest earlier rate; missing rates do not raise
+    gaps = convert_revenue(df.assign(Date=['2024-11-30', '2024-12-05', '2024-12-01', '2024-12-02']),
+                           {'2024-12-01': {'EUR': 0.9}, '2024-12-02': {'EUR': 0.8}}, ['EUR', 'GBP'])
+    assert np.allclose(gaps['TotalPrice_EUR'], [90.0, 160.0, 45.0, 8.0]), "Gaps should use the closest rate"
+    assert gaps['TotalPrice_GBP'].isna().all(), "A currency without rates should convert to NaN"
+    assert convert_revenue(df, {}, ['EUR'])['TotalPrice_EUR'].isna().all(), "Empty rates should not raise"
+
+    # Missing dates get no rate instead of borrowing a neighbouring date's
+    for dates in (pd.to_datetime(['2024-12-01', None, '2024-12-03', None]),
+                  ['2024-12-01', None, '2024-12-03', np.nan]):
+        undated = convert_revenue(df.assign(Date=dates), date_rates, ['EUR'])
+        assert np.allclose(undated['TotalPrice_EUR'], [90.0, np.nan, 50.0, np.nan], equal_nan=True), \
+            "Rows without a date should convert to NaN"
+
+    print("✓ Multi-currency revenue conversion PASSED")
+
+
+def test_validate_and_clean_reasons():
+    """Each invalid row records the first rule it fails; the input is left untouched"""
+    print("\n" + "="*70)
+    print("TEST: Validation reasons")
+    print("="*70)
+
+    df = pd.DataFrame({
+        'TransactionID': ['T001', 'X002', 'T003', 'T004', 'T005', 'T006', 'X007'],
+        'Quantity': ['2', '1', '0', '1,500', '3', '4', '-1'],
+        'UnitPrice': ['450', '10', '10', '-5', '20', '30', 'abc'],
+        'CustomerID': ['C001', 'C002', 'C003', 'C004', '  ', 'C006', 'C007'],
+        'Region': ['North', 'South', 'East', 'West', 'North', '', 'South']
+    })
+    snapshot = df.copy()
+
+    valid_df, invalid_df = validate_and_clean(df)
+
+    assert list(valid_df['TransactionID']) == ['T001'], "Only the first row passes every rule"
+    assert valid_df['TotalPrice'].tolist() == [900], "TotalPrice should use cleaned numbers"
+    assert list(invalid_df['Reason']) == [
+        'Invalid TransactionID format', 'Invalid quantity', 'Invalid price',
+        'Missing CustomerID', 'Missing Region', 'Invalid TransactionID format'
+    ], "Reason should be the first failing rule"
+    assert invalid_df.loc[3, 'Quantity'] == 1500, "Invalid rows should keep cleaned numbers"
+    assert not invalid_df['Valid'].any(), "Invalid rows should be flagged"
+    assert 'Reason' not in valid_df.columns, "Valid rows should not carry validation columns"
+    pd.testing.assert_frame_equal(df, snapshot)
+
+    print("✓ Validation reasons PASSED")
+
+
+def test_clean_numeric_column():
+    """Numbers parsed at read time skip cleaning; text columns are still cleaned"""
+    print("\n" + "="*70)
+    print("TEST: Numeric cleaning")
+    print("="*70)
+
+    df = read_sales_data('data/sales_data.txt')
+    assert df['Quantity'].dtype == np.int32, "Quantity should be numeric straight from the reader"
+    assert df['UnitPrice'].dtype == np.float64, "Thousands separators should be parsed while reading"
+    unit_price = df['UnitPrice']
+    assert clean_numeric_column(unit_price) is unit_price, "Numeric columns should pass through"
+
+    text = pd.Series(['1,916', '45000', 'abc', None, '2.5'])
+    cleaned = clean_numeric_column(text)
+    assert cleaned[:2].tolist() == [1916, 45000] and cleaned[4] == 2.5, "Commas should be removed"
+    assert cleaned[2:4].isna().all(), "Unparseable values should become NaN"
+
+    print("✓ Numeric cleaning PASSED")
+
+
+def test_analyze_sales_matches_groupby():
+    """Shared-key aggregation gives the same numbers and orderings as pandas groupby"""
+    print("\n" + "="*70)
+    print("TEST: Sales analysis")
+    print("="*70)
+
+    df = pd.DataFrame({
+        'Region': ['North', 'South', None, 'North', 'East', 'South', 'East'],
+        'ProductName': ['Mouse', 'Laptop', 'Mouse', 'Cable', 'Laptop', 'Cable', 'Mouse'],
+        'CustomerID': ['C3', 'C1', 'C2', 'C1', 'C4', 'C6', 'C5'],
+        'Quantity': [2, 1, 4, 3, 1, 3, 2],
+        'TotalPrice': [50.0, 900.0, 100.0, 30.0, 900.0, 30.0, 50.0]
+    }).astype({'Region': 'category', 'CustomerID': 'category'})
+
+    analysis = analyze_sales(df)
+    totals = df['TotalPrice']
+    assert analysis['total_revenue'] == totals.sum()
+    assert analysis['median_transaction'] == totals.median()
+    assert np.isclose(analysis['std_dev'], np.std(totals)), "std_dev should be the population std"
+    assert analysis['total_units'] == 16
+
+    by_region = df.groupby('Region', observed=True)['TotalPrice'].sum().to_dict()
+    assert analysis['region_sales'] == by_region, "Missing regions should be dropped like groupby"
+    assert list(analysis['region_sales']) == ['East', 'North', 'South'], "Regions should stay in key order"
+
+    by_customer = df.groupby('CustomerID', observed=True)['TotalPrice'].sum().nlargest(5)
+    assert analysis['top_customers'] == list(by_customer.items()), "Ties should break like nlargest"
+
+    assert [name for name, _ in analysis['top_products']] == ['Laptop', 'Mouse', 'Cable']
+    assert analysis['top_products'][1][1] == {'revenue': 200.0, 'units': 8}
+    assert isinstance(analysis['top_products'][1][1]['units'], np.float64), "Units should stay float64"
+
+    gaps = analyze_sales(df.assign(Quantity=[2, 1, 4, np.nan, 1, 3, 2]))
+    assert gaps['total_units'] == 13, "Missing quantities should be skipped"
+    assert dict(gaps['top_products'])['Cable']['units'] == 3, "Missing quantities should be skipped per product"
+
+    assert analyze_sales(df.iloc[:0]) == {}
+
+    print("✓ Sales analysis PASSED")
+
+
+def test_analyze_sales_stream():
+    """Chunked streaming analysis matches the in-memory analysis on small data"""
+    print("\n" + "="*70)
+    print("TEST: Streaming sales analysis")
+    print("="*70)
+
+    valid_df, _ = validate_and_clean(read_sales_data('data/sales_data.txt'))
+    expected = analyze_sales(valid_df)
+    chunks = read_sales_data_frames('data/sales_data.txt', chunk_rows=10)
+    streamed = analyze_sales_stream(validate_and_clean(chunk)[0] for chunk in chunks)
+
+    for key in ['total_revenue', 'avg_transaction', 'median_transaction', 'std_dev',
+                'min_transaction', 'max_transaction']:
+        assert np.isclose(streamed[key], expected[key]), f"{key} should match"
+    for key in ['transaction_count', 'total_units', 'region_sales', 'top_customers', 'top_products']:
+        assert streamed[key] == expected[key], f"{key} should match"
+    assert set(expected) <= set(streamed), "Every analyze_sales key should be present"
+    assert round(streamed['distinct_customers']) == valid_df['CustomerID'].nunique()
+    assert streamed['error_bounds']['percentile_rank'] == 0.0, "Small data should be exact"
+    assert streamed['error_bounds']['top_customers'] == 0.0, "Few customers should be exact"
+
+    # Past the first compaction the results still repeat from run to run
+    rng = np.random.default_rng(3)
+    large = pd.DataFrame({'Region': 'North', 'ProductName': 'Mouse', 'Quantity': 1,
+                          'CustomerID': rng.integers(0, 500, 20000).astype(str),
+                          'TotalPrice': rng.random(20000)})
+    runs = [analyze_sales_stream(large.iloc[i:i + 400] for i in range(0, len(large), 400))
+            for _ in range(2)]
+    assert runs[0]['error_bounds']['percentile_rank'] > 0
+    assert runs[0]['percentiles'] == runs[1]['percentiles'], "Streaming results should be reproducible"
+    assert analyze_sales_stream([]) == {}
+
+    fractional = analyze_sales_stream([large.iloc[:2].assign(Quantity=[1.5, 2.25]),
+                                       large.iloc[2:3].assign(Quantity=[0.5])])
+    assert fractional['total_units'] == 4.25, "Fractional units should not be truncated"
+    assert fractional['top_products'][0][1]['units'] == 4.25
+
+    print("✓ Streaming sales analysis PASSED")
@@ -0,0 +1,332 @@
+"""
+Tests for the streaming and large-file readers in utils/file_handler.py
+"""
+
+import gzip
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.file_handler import (
+    COLUMNAR_EXTENSION,
+    detect_encoding,
+    get_undecodable_count,
+    load_transactions,
+    read_sales_data,
+    read_sales_data_chunks,
+    read_sales_data_lines,
+    read_sales_data_frames,
+    read_sales_data_mmap,
+    parse_transactions,
+    parse_transactions_parallel,
+    save_cleaned_data,
+    save_columnar,
+    write_report
+)
+
+DATA_FILE = 'data/sales_data.txt'
+
+HEADER = b'TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n'
+
+
+def test_read_sales_data_chunks():
+    """Chunked reader yields bounded batches covering every data line"""
+    print("\n" + "="*70)
+    print("TEST: Streaming chunked reader")
+    print("="*70)
+
+    chunks = list(read_sales_data_chunks(DATA_FILE, chunk_rows=25))
+    lines = [line for chunk in chunks for line in chunk]
+
+    assert len(chunks) > 1, "Should yield more than one chunk"
+    assert all(len(chunk) <= 25 for chunk in chunks), "Chunks should respect chunk_rows"
+    assert len(lines) == 80, f"Should read 80 data lines, got {len(lines)}"
+    assert not lines[0].startswith('TransactionID'), "Header should be skipped"
+    assert all(line for line in lines), "Empty lines should be skipped"
+
+    byte_chunks = list(read_sales_data_chunks(DATA_FILE, chunk_rows=None, chunk_bytes=512))
+    assert sum(len(chunk) for chunk in byte_chunks) == 80, "Byte budget should not drop lines"
+    assert len(byte_chunks) > 1, "Byte budget should split the file"
+
+    transactions = [t for chunk in chunks for t in parse_transactions(chunk)]
+    assert len(transactions) == 80, "Chunks should parse like the whole file"
+
+    print("✓ Chunked reader PASSED")
+
+
+def test_read_sales_data_frames():
+    """Chunked pandas reader yields DataFrames covering every record"""
+    print("\n" + "="*70)
+    print("TEST: Streaming DataFrame reader")
+    print("="*70)
+
+    frames = list(read_sales_data_frames(DATA_FILE, chunk_rows=30))
+
+    assert len(frames) == 3, f"Should yield 3 frames, got {len(frames)}"
+    assert sum(len(df) for df in frames) == 80, "Frames should cover all records"
+    assert 'Region' in frames[0].columns, "Frames should keep the header columns"
+
+    whole = read_sales_data(DATA_FILE)
+    for df in frames:
+        assert df.dtypes.astype(str).to_dict() == whole.dtypes.astype(str).to_dict(), \
+            "Frames should use the read_sales_data schema"
+    assert pd.api.types.is_string_dtype(whole['CustomerID']), "CustomerID should stay a string column"
+
+    projected = next(read_sales_data_frames(DATA_FILE, chunk_rows=30, columns=['Region', 'Quantity']))
+    assert list(projected.columns) == ['Quantity', 'Region'], "Only the requested columns should load"
+    assert projected['Region'].dtype == 'category' and projected['Quantity'].dtype == np.int32
+
+    print("✓ DataFrame reader PASSED")
+
+
+def test_detect_encoding(tmp_path):
+    """Encoding is sniffed from a prefix and undecodable bytes are counted"""
+    print("\n" + "="*70)
+    print("TEST: Encoding detection")
+    print("="*70)
+
+    assert detect_encoding(DATA_FILE) == 'utf-8', "Sample data should be utf-8"
+
+    cp1252_file = os.path.join(tmp_path, 'cp1252.txt')
+    with open(cp1252_file, 'wb') as f:
+        f.write(HEADER + 'T001|2024-12-01|P101|Caf\u00e9 Mug \u20ac|2|450|C001|North\n'.encode('cp1252'))
+    assert detect_encoding(cp1252_file) == 'cp1252', "Should fall back to cp1252"
+
+    chunks = list(read_sales_data_chunks(cp1252_file))
+    assert chunks[0][0].split('|')[3] == 'Caf\u00e9 Mug \u20ac', "Should decode with sniffed codec"
+
+    # Bad byte past the sniffed prefix is dropped and reported
+    late_bad_file = os.path.join(tmp_path, 'late_bad.txt')
+    with open(late_bad_file, 'wb') as f:
+        f.write(HEADER + b'T001|2024-12-01|P101|Mouse|2|450|C001|North\n' * 10)
+        f.write(b'T002|2024-12-01|P101|Mo\xffuse|2|450|C001|North\n')
+    encoding = detect_encoding(late_bad_file, sample_size=64)
+    assert encoding == 'utf-8', "Prefix is valid utf-8"
+
+    lines = [line for chunk in read_sales_data_chunks(late_bad_file, encoding=encoding) for line in chunk]
+    assert len(lines) == 11, "Every line should still be read"
+    assert get_undecodable_count() == 1, f"Should report 1 bad byte, got {get_undecodable_count()}"
+
+    # The pandas readers count bad bytes past the 64 KB sniffed prefix too
+    with open(late_bad_file, 'wb') as f:
+        f.write(HEADER + b'T001|2024-12-01|P101|Mouse|2|450|C001|North\n' * 2000)
+        f.write(b'T002|2024-12-01|P101|Mo\xffuse|2|450|C001|North\n')
+    df = read_sales_data(late_bad_file)
+    assert len(df) == 2001 and df['ProductName'].iloc[-1] == 'Mouse', "Bad byte should be dropped"
+    assert get_undecodable_count() == 1, "read_sales_data should count the bad byte"
+    frames = list(read_sales_data_frames(late_bad_file, chunk_rows=500))
+    assert sum(len(frame) for frame in frames) == 2001
+    assert get_undecodable_count() == 1, "read_sales_data_frames should count the bad byte"
+
+    print("✓ Encoding detection PASSED")
+
+
+def test_read_sales_data_mmap(tmp_path):
+    """Memory-mapped records match parse_transactions and feed the analysis functions"""
+    print("\n" + "="*70)
+    print("TEST: Memory-mapped reader")
+    print("="*70)
+
+    from analysis_standalone import region_wise_sales
+
+    raw_lines = [line for chunk in read_sales_data_chunks(DATA_FILE) for line in chunk]
+    expected = parse_transactions(raw_lines)
+
+    with read_sales_data_mmap(DATA_FILE) as records:
+        mapped = [dict(record) for record in records]
+        assert mapped == expected, "Mapped records should equal parsed transactions"
+        assert region_wise_sales(records) == region_wise_sales(expected), \
+            "Region aggregation should match"
+        assert [dict(record) for record in records] == expected, "Iterating again should give the same records"
+        assert records.to_table().to_records() == expected, "Column-wise table should match"
+
+    messy_file = os.path.join(tmp_path, 'messy.txt')
+    with open(messy_file, 'wb') as f:
+        f.write(HEADER.replace(b'\n', b'\r\n'))
+        f.write(b'T001|2024-12-01|P101| Laptop |1,200|45,000|C001|North\r\n')
+        f.write(b'\r\n')
+        f.write(b'T002|2024-12-01|P101|Laptop|2|45000|C001\r\n')
+        f.write(b'T003|2024-12-01|P101|Laptop|two|45000|C001|North\r\n')
+        f.write(b'T004|2024-12-02|P102|Mouse|3|500|C002|South\r\n')
+        f.write(b'T005|2024-12-02|P103|' + b'Long Name ' * 10 + b'|1|10|C003|South')
+
+    with read_sales_data_mmap(messy_file) as records:
+        rows = list(records)
+        assert [r['TransactionID'] for r in rows] == ['T001', 'T004', 'T005'], "Bad rows should be skipped"
+        assert records.skipped_count == 2, f"Should skip 2 rows, got {records.skipped_count}"
+        assert rows[0]['Quantity'] == 1200 and rows[0]['UnitPrice'] == 45000.0, "Commas removed"
+        assert rows[0]['ProductName'] == 'Laptop', "Fields should be stripped"
+        assert rows[2]['Region'] == 'South', "Last line without newline should be read"
+        assert records.to_table().to_records() == [dict(r) for r in rows], \
+            "Table should match the records, long fields included"
+        assert records.to_table(['TransactionID', 'Quantity']).to_records()[:2] == \
+            [{'TransactionID': 'T001', 'Quantity': 1200}, {'TransactionID': 'T004', 'Quantity': 3}], \
+            "Table should hold the requested columns of the kept rows"
+
+    print("✓ Memory-mapped reader PASSED")
+
+
+def test_parse_transactions_parallel():
+    """Byte-range sharded parsing gives the same transactions as the serial parser"""
+    print("\n" + "="*70)
+    print("TEST: Parallel parsing")
+    print("="*70)
+
+    raw_lines = [line for chunk in read_sales_data_chunks(DATA_FILE) for line in chunk]
+    expected = parse_transactions(raw_lines)
+
+    transactions, shard_skips = parse_transactions_parallel(DATA_FILE, workers=3, shard_bytes=400)
+
+    assert len(shard_skips) > 3, "Small shard size should produce several shards"
+    assert transactions == expected, "Merged shards should preserve file order and content"
+    assert sum(shard_skips) == 0, "Sample data has no malformed lines"
+
+    print("✓ Parallel parsing PASSED")
+
+
+def test_parse_transactions_parallel_line_breaks(tmp_path):
+    """Only newlines end lines in both parsers; worker processes report bad bytes"""
+    print("\n" + "="*70)
+    print("TEST: Parallel parsing line breaks")
+    print("="*70)
+
+    odd_file = os.path.join(tmp_path, 'odd.txt')
+    with open(odd_file, 'wb') as f:
+        f.write(HEADER)
+        for i in range(40):
+            name = 'Mouse\u2028Pad' if i % 10 == 3 else 'Cable\x1cUSB' if i % 10 == 7 else 'Mouse'
+            f.write(f'T{i:03d}|2024-12-01|P101|{name}|2|450|C001|North\r\n'.encode('utf-8'))
+        f.write(b'T099|2024-12-01|P101|Mo\xffuse|2|450|C001|North\n')
+
+    raw_lines = [line for chunk in read_sales_data_chunks(odd_file, encoding='utf-8') for line in chunk]
+    expected = parse_transactions(raw_lines)
+
+    transactions, shard_skips = parse_transactions_parallel(odd_file, workers=3, shard_bytes=300,
+                                                            encoding='utf-8')
+    assert len(shard_skips) > 3, "Small shard size should produce several shards"
+    assert transactions == expected and len(transactions) == 41, "Parsers should agree on every line"
+    assert get_undecodable_count() == 1, "Bad bytes found by workers should be counted"
+
+    print("✓ Parallel parsing line breaks PASSED")
+
+
+def test_load_transactions_cache(tmp_path):
+    """Parsed transactions are reused until the file content changes"""
+    print("\n" + "="*70)
+    print("TEST: Parse-result cache")
+    print("="*70)
+
+    data_file = os.path.join(tmp_path, 'sales.txt')
+    cache_dir = os.path.join(tmp_path, 'cache')
+    with open(DATA_FILE, 'rb') as f:
+        content = f.read()
+    with open(data_file, 'wb') as f:
+        f.write(content)
+
+    expected = parse_transactions(read_sales_data_lines(data_file))
+    assert load_transactions(data_file, cache_dir=cache_dir) == expected, "First load should parse"
+    assert len(os.listdir(cache_dir)) == 1, "First load should write one cache file"
+
+    # Same bytes with a new mtime still hits the cache
+    os.utime(data_file, ns=(0, 0))
+    cached = load_transactions(data_file, cache_dir=cache_dir, as_table=True)
+    assert cached.to_records() == expected, "Cached table should equal parsed rows"
+    assert 'TransactionID' in cached._plain, "Unique IDs should be cached without a category array"
+
+    # Same size, different content must be re-parsed
+    with open(data_file, 'wb') as f:
+        f.write(content.replace(b'|North', b'|NORTH', 1))
+    reparsed = load_transactions(data_file, cache_dir=cache_dir)
+    assert reparsed != expected, "Changed content should not come from the cache"
+    assert 'NORTH' in {t['Region'] for t in reparsed}, "Re-parsed rows should reflect the new content"
+
+    print("✓ Parse-result cache PASSED")
+
+
+def test_save_cleaned_data_formats(tmp_path):
+    """One pass writes pipe and CSV files identical to DataFrame.to_csv"""
+    print("\n" + "="*70)
+    print("TEST: Multi-format writer")
+    print("="*70)
+
+    df = read_sales_data_frames(DATA_FILE, chunk_rows=100)
+    df = pd.concat(list(df)).astype({'ProductName': str})
+    df = df.assign(Rating=np.where(np.arange(80) % 3, 4.5, np.nan))
+    df.loc[df.index[0], 'ProductName'] = 'Cable | "Braided"'
+
+    txt_file = os.path.join(tmp_path, 'out.txt')
+    csv_file = os.path.join(tmp_path, 'out.csv')
+    snapshot = df.copy()
+    assert save_cleaned_data([txt_file, csv_file], df), "Writing should succeed"
+
+    for path, sep in ((txt_file, '|'), (csv_file, ',')):
+        expected_file = os.path.join(tmp_path, 'expected' + os.path.splitext(path)[1])
+        df.to_csv(expected_file, sep=sep, index=False)
+        with open(path, encoding='utf-8') as f, open(expected_file, encoding='utf-8') as g:
+            assert f.read() == g.read(), f"{path} should match to_csv"
+
+    pd.testing.assert_frame_equal(df, snapshot, obj="Written DataFrame")
+    assert save_cleaned_data(os.path.join(tmp_path, 'single.txt'), df), "A single path should still work"
+
+    print("✓ Multi-format writer PASSED")
+
+
+def test_columnar_round_trip(tmp_path):
+    """Columnar files reload through read_sales_data with the same values"""
+    print("\n" + "="*70)
+    print("TEST: Columnar output")
+    print("="*70)
+
+    df = read_sales_data(DATA_FILE)
+    df['Rating'] = np.where(np.arange(len(df)) % 3, 4.5, np.nan)
+    df['Matched'] = df['Rating'].notna()
+
+    npz_file = save_columnar(os.path.join(tmp_path, 'sales.npz'), df)
+    reloaded = read_sales_data(npz_file)
+    pd.testing.assert_frame_equal(reloaded, df)
+    assert reloaded['CustomerID'].isna().sum() == df['CustomerID'].isna().sum(), "Missing text should stay missing"
+
+    # Preferred format (Parquet, or .npz without pyarrow) through save_cleaned_data
+    requested = os.path.join(tmp_path, 'cleaned.parquet')
+    assert save_cleaned_data([requested], df), "Columnar save should succeed"
+    written = os.path.join(tmp_path, 'cleaned' + COLUMNAR_EXTENSION)
+    assert os.path.exists(written), f"{written} should be written"
+    pd.testing.assert_frame_equal(read_sales_data(written), df)
+
+    print("✓ Columnar output PASSED")
+
+
+def test_compressed_files(tmp_path):
+    """Compressed inputs stream through every reader; outputs compress by extension"""
+    print("\n" + "="*70)
+    print("TEST: Compressed files")
+    print("="*70)
+
+    with open(DATA_FILE, 'rb') as f:
+        content = f.read()
+    gz_file = os.path.join(tmp_path, 'sales.txt.gz')
+    with gzip.open(gz_file, 'wb') as f:
+        f.write(content)
+
+    expected = parse_transactions(read_sales_data_lines(DATA_FILE))
+    assert parse_transactions(read_sales_data_lines(gz_file)) == expected, "Line reader should decompress"
+    chunks = list(read_sales_data_chunks(gz_file, chunk_rows=30))
+    assert parse_transactions([line for chunk in chunks for line in chunk]) == expected, \
+        "Chunked reader should decompress"
+    transactions, shard_skips = parse_transactions_parallel(gz_file, shard_bytes=1000)
+    assert transactions == expected and len(shard_skips) > 1, "Compressed file should parse in chunks"
+    pd.testing.assert_frame_equal(read_sales_data(gz_file), read_sales_data(DATA_FILE))
+
+    df = read_sales_data(DATA_FILE)
+    paths = [os.path.join(tmp_path, name) for name in ('out.txt.bz2', 'out.csv.xz', 'out.txt')]
+    assert save_cleaned_data(paths, df), "Compressed outputs should be written"
+    pd.testing.assert_frame_equal(read_sales_data(paths[0]), read_sales_data(paths[2]))
+    assert pd.read_csv(paths[1]).shape == df.shape, "Compressed CSV should stay comma-separated"
+
+    report_file = os.path.join(tmp_path, 'report.txt.gz')
+    write_report(report_file, 'SALES REPORT\n')
+    with gzip.open(report_file, 'rt', encoding='utf-8') as f:
+        assert f.read() == 'SALES REPORT\n', "Report should be gzip-compressed"
+
+    print("✓ Compressed files PASSED")
@@ -0,0 +1,116 @@
+"""
+Tests for the mergeable statistics sketches in utils/sketches.py
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from utils.sketches import DistinctCountSketch, HeavyHittersSketch, MomentSketch, QuantileSketch
+
+
+def test_moments_and_quantiles_merge():
+    """Chunked, merged sketches agree with NumPy on the whole array"""
+    print("\n" + "="*70)
+    print("TEST: Moment and quantile sketches")
+    print("="*70)
+
+    values = np.random.default_rng(1).lognormal(5, 1, 200000)
+    chunks = np.array_split(values, 7)
+
+    moments = MomentSketch()
+    quantiles = QuantileSketch(seed=0)
+    for seed, chunk in enumerate(chunks):
+        moments.merge(MomentSketch().update(chunk))
+        # Sketches from other processes arrive pickled
+        part = pickle.loads(pickle.dumps(QuantileSketch(seed=seed).update(chunk)))
+        quantiles.merge(part)
+
+    assert moments.count == len(values)
+    assert np.isclose(moments.total, values.sum()) and np.isclose(moments.mean, values.mean())
+    assert np.isclose(moments.std(), values.std()), "Chan merge should give the population std"
+    assert moments.min == values.min() and moments.max == values.max()
+
+    assert not quantiles.is_exact
+    assert sum(len(level) for level in quantiles.levels) < 3 * quantiles.k, "Memory should stay bounded"
+    ordered = np.sort(values)
+    for q in [0.01, 0.5, 0.9, 0.99]:
+        rank = np.searchsorted(ordered, quantiles.quantile(q)) / len(values)
+        assert abs(rank - q) <= quantiles.rank_error, f"Quantile {q} outside the stated rank error"
+
+    small = QuantileSketch().update([5.0, 1.0, np.nan, 3.0, 2.0])
+    assert small.is_exact and small.quantile(0.5) == 2.5, "Small inputs should be exact"
+
+    print("✓ Moment and quantile sketches PASSED")
+
+
+def test_quantile_rank_error_bound():
+    """The stated rank error holds over many seeds for streams of small chunks"""
+    print("\n" + "="*70)
+    print("TEST: Quantile sketch rank error bound")
+    print("="*70)
+
+    percentiles = np.linspace(0.01, 0.99, 99)
+    worst = 0.0
+    for seed in range(20):
+        values = np.random.default_rng(100 + seed).random(100000)
+        sketch = QuantileSketch(seed=seed)
+        for chunk in np.array_split(values, 1000):
+            sketch.update(chunk)
+
+        estimates = [sketch.quantile(q) for q in percentiles]
+        ranks = np.searchsorted(np.sort(values), estimates, side='right') / len(values)
+        worst = max(worst, np.abs(ranks - percentiles).max())
+
+    print(f"Worst rank error {worst:.4f}, stated bound {sketch.rank_error:.4f}")
+    assert worst <= sketch.rank_error, "Rank error should stay within the stated bound"
+
+    print("✓ Quantile sketch rank error bound PASSED")
+
+
+def test_distinct_count_sketch():
+    """HyperLogLog estimates stay within a few standard errors and merge by union"""
+    print("\n" + "="*70)
+    print("TEST: Distinct count sketch")
+    print("="*70)
+
+    left = DistinctCountSketch().update([f'C{i}' for i in range(30000)])
+    right = DistinctCountSketch().update([f'C{i}' for i in range(20000, 50000)] + [None])
+    assert abs(left.estimate() / 30000 - 1) < 3 * left.relative_error
+
+    merged = left.merge(right)
+    assert abs(merged.estimate() / 50000 - 1) < 3 * merged.relative_error, "Merge should count the union"
+    assert round(DistinctCountSketch().update(['C1', 'C2', 'C1']).estimate()) == 2
+
+    print("✓ Distinct count sketch PASSED")
+
+
+def test_heavy_hitters_sketch():
+    """Top totals survive a bounded summary and are low by at most the reported error"""
+    print("\n" + "="*70)
+    print("TEST: Heavy hitters sketch")
+    print("="*70)
+
+    rng = np.random.default_rng(7)
+    keys = np.concatenate([rng.integers(0, 5, 5000), rng.integers(5, 20000, 50000)]).astype(str)
+    amounts = pd.Series(rng.random(len(keys)) * 100, index=keys)
+    exact = amounts.groupby(level=0).sum()
+
+    sketch = HeavyHittersSketch(capacity=200)
+    for part in np.array_split(np.arange(len(keys)), 4):
+        partial = HeavyHittersSketch(capacity=200)
+        for rows in np.array_split(part, 25):
+            partial.update(amounts.iloc[rows].groupby(level=0).sum())
+        sketch.merge(partial)
+
+    assert len(sketch.totals) <= 200 and sketch.error > 0
+    top = sketch.top(5)
+    assert sorted(key for key, _ in top) == sorted(exact.nlargest(5).index), "Heavy keys should be found"
+    for key, total in top:
+        assert exact[key] - sketch.error <= total <= exact[key], "Totals should be within the error"
+
+    small = HeavyHittersSketch().update(pd.Series([5.0, 9.0, 9.0], index=['b', 'c', 'a']))
+    assert small.top(2) == [('a', 9.0), ('c', 9.0)] and small.error == 0.0, "Ties should keep key order"
+
+    print("✓ Heavy hitters sketch PASSED")
@@ -0,0 +1,255 @@
+"""
+Tests for the columnar TransactionTable and the analysis functions built on it
+"""
+
+import io
+import os
+
+import numpy as np
+
+from utils.file_handler import (
+    read_sales_data_chunks,
+    parse_transactions,
+    parse_transactions_parallel,
+    validate_and_filter
+)
+from utils.transaction_table import TransactionTable, TransactionTableBuilder
+from utils.sales_aggregates import (
+    SalesAggregates,
+    sales_aggregates,
+    refresh_aggregates,
+    top_n,
+    bottom_n
+)
+from analysis_standalone import (
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    top_customers,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+
+DATA_FILE = 'data/sales_data.txt'
+
+
+def load_transactions():
+    raw_lines = [line for chunk in read_sales_data_chunks(DATA_FILE) for line in chunk]
+    return parse_transactions(raw_lines)
+
+
+def test_transaction_table_round_trip():
+    """Tables built by the parser or from dicts convert back to the same dicts"""
+    print("\n" + "="*70)
+    print("TEST: TransactionTable round trip")
+    print("="*70)
+
+    transactions = load_transactions()
+    raw_lines = [line for chunk in read_sales_data_chunks(DATA_FILE) for line in chunk]
+    table = parse_transactions(raw_lines, as_table=True)
+
+    assert isinstance(table, TransactionTable), "as_table should return a TransactionTable"
+    assert len(table) == len(transactions), "Table should hold every parsed row"
+    assert table.to_records() == transactions, "Table rows should equal parsed dicts"
+    assert TransactionTable.from_records(transactions).to_records() == transactions, \
+        "from_records should round-trip"
+    assert len(table.categories('Region')) < len(table), "Region should be dictionary-encoded"
+    assert 'TransactionID' in table._plain, "Unique IDs should be stored as plain values"
+    assert table.column('Quantity').dtype == np.int64, "Quantity should be an int64 column"
+
+    parallel_table, _ = parse_transactions_parallel(DATA_FILE, workers=2, shard_bytes=500, as_table=True)
+    assert parallel_table.to_records() == transactions, "Merged shard tables should match"
+
+    # Float quantities are accepted like the dict-based code accepted them
+    records = [dict(transactions[0], Quantity=2.0), dict(transactions[1], Quantity=1.5)]
+    floats = TransactionTable.from_records(records)
+    assert floats.column('Quantity').tolist() == [2.0, 1.5], "Fractional quantities should be kept"
+    assert TransactionTable.from_records(records[:1]).column('Quantity').dtype == np.int64
+
+    # The builder converts its rows in batches and joins them
+    builder = TransactionTableBuilder(batch_rows=7)
+    for transaction in transactions:
+        builder.append(transaction)
+    assert builder.build().to_records() == transactions, "Batched building should keep every row"
+
+    # Column-projected tables concatenate on their own columns
+    projected = TransactionTable.from_records(transactions, columns=['Region', 'Quantity'])
+    merged = TransactionTable.concat([projected, projected])
+    assert merged.columns == ['Quantity', 'Region'] and len(merged) == 2 * len(transactions)
+    assert merged.column('Region')[len(transactions):] == projected.column('Region')
+
+    # Plain columns survive take, concat with encoded tables, save/load and late encoding
+    listed = TransactionTable.from_record_list(transactions, columns=['TransactionID', 'Region'])
+    assert 'TransactionID' in listed._plain and 'Region' not in listed._plain
+    first = listed.take(np.arange(3))
+    encoded = listed.take(np.arange(3, len(listed)))
+    encoded.codes('TransactionID')
+    assert TransactionTable.concat([first, encoded]).to_records() == listed.to_records()
+    saved = io.BytesIO()
+    listed.save(saved)
+    saved.seek(0)
+    assert TransactionTable.load(saved).to_records() == listed.to_records(), "Plain columns should round-trip"
+    ids = listed.categories('TransactionID')
+    assert [ids[code] for code in listed.codes('TransactionID')] == [t['TransactionID'] for t in transactions]
+
+    print("✓ TransactionTable round trip PASSED")
+
+
+def test_analysis_on_table():
+    """Analysis functions give identical results for dicts and tables"""
+    print("\n" + "="*70)
+    print("TEST: Analysis functions on TransactionTable")
+    print("="*70)
+
+    transactions = load_transactions()
+    table = TransactionTable.from_records(transactions)
+
+    assert region_wise_sales(table) == region_wise_sales(transactions), "Regions should match"
+    assert top_selling_products(table) == top_selling_products(transactions), "Top products should match"
+    assert customer_analysis(table) == customer_analysis(transactions), "Customers should match"
+    assert daily_sales_trend(table) == daily_sales_trend(transactions), "Daily trend should match"
+    assert low_performing_products(table, 30) == low_performing_products(transactions, 30), \
+        "Low performers should match"
+
+    # Group order follows the filtered rows, not the original categories
+    subset = table.take(np.arange(len(table))[::-1][:20])
+    assert list(region_wise_sales(subset)) == list(region_wise_sales(subset.to_records())), \
+        "Subset grouping should follow first appearance"
+
+    north = region_wise_sales(transactions)['North']
+    expected = sum(t['Quantity'] * t['UnitPrice'] for t in transactions if t['Region'] == 'North')
+    assert abs(north['total_sales'] - expected) < 1e-6, "Region total should equal a manual sum"
+
+    print("✓ Analysis on TransactionTable PASSED")
+
+
+def test_validate_and_filter_on_table():
+    """Mask-based validation gives the same results for dicts and tables"""
+    print("\n" + "="*70)
+    print("TEST: validate_and_filter on TransactionTable")
+    print("="*70)
+
+    transactions = load_transactions()
+    table = TransactionTable.from_records(transactions)
+
+    valid, invalid_count, summary = validate_and_filter(transactions, region='North', min_amount=5000)
+    valid_table, table_invalid_count, table_summary = validate_and_filter(
+        table, region='North', min_amount=5000
+    )
+
+    assert all(t in transactions for t in valid), "List input should return the input dicts"
+    assert isinstance(valid_table, TransactionTable), "Table input should return a table"
+    assert valid_table.to_records() == valid, "Both inputs should keep the same rows"
+    assert (invalid_count, summary) == (table_invalid_count, table_summary), "Summaries should match"
+    assert all(t['Region'] == 'North' and t['Quantity'] * t['UnitPrice'] >= 5000 for t in valid), \
+        "Filters should be applied"
+
+    assert TransactionTable.from_record_list(transactions).to_records() == transactions, \
+        "Column-wise build should match from_records"
+    odd = [dict(transactions[0], TransactionID=101), dict(transactions[0], Quantity=2.0)]
+    odd_valid, odd_invalid, _ = validate_and_filter(odd)
+    assert odd_invalid == 1 and odd_valid == [odd[1]], "Non-string IDs should be rejected, not raise"
+
+    print("✓ validate_and_filter on TransactionTable PASSED")
+
+
+def test_sales_aggregates_shared():
+    """One SalesAggregates serves every report section with the same results"""
+    print("\n" + "="*70)
+    print("TEST: Shared SalesAggregates")
+    print("="*70)
+
+    transactions = load_transactions()
+    aggregates = SalesAggregates(TransactionTable.from_records(transactions))
+
+    assert region_wise_sales(aggregates) == region_wise_sales(transactions), "Regions should match"
+    assert customer_analysis(aggregates) == customer_analysis(transactions), "Customers should match"
+    assert find_peak_sales_day(aggregates) == find_peak_sales_day(transactions), "Peak day should match"
+    restored = SalesAggregates.from_state(aggregates.to_state())
+    assert daily_sales_trend(aggregates) == daily_sales_trend(restored), \
+        "Customer counts should match the per-day customer sets"
+    assert customer_analysis(aggregates) == customer_analysis(restored), "Product sets should round-trip"
+    assert top_selling_products(aggregates) == top_selling_products(transactions), "Products should match"
+    assert low_performing_products(aggregates, 30) == low_performing_products(transactions, 30), \
+        "Low performers should match"
+    assert sales_aggregates(aggregates) is aggregates, "Aggregates should pass through unchanged"
+
+    fractional = [dict(transactions[0], Quantity=1.5), dict(transactions[0], Quantity=2.25)]
+    assert top_selling_products(fractional, n=1)[0][1] == 3.75, "Fractional units should not be truncated"
+
+    print("✓ Shared SalesAggregates PASSED")
+
+
+def test_top_n_selection():
+    """Heap-based top-N keeps sorted() order, including ties"""
+    print("\n" + "="*70)
+    print("TEST: Top-N selection")
+    print("="*70)
+
+    items = [('A', 5), ('B', 9), ('C', 5), ('D', 1), ('E', 9), ('F', 5)]
+    assert top_n(items, 3, key=lambda x: x[1]) == sorted(items, key=lambda x: x[1], reverse=True)[:3], \
+        "top_n should match a stable descending sort"
+    assert bottom_n(items, 4, key=lambda x: x[1]) == sorted(items, key=lambda x: x[1])[:4], \
+        "bottom_n should match a stable ascending sort"
+
+    transactions = load_transactions()
+    ranked = list(customer_analysis(transactions).items())[:5]
+    assert top_customers(transactions, n=5) == [(c, d['total_spent']) for c, d in ranked], \
+        "top_customers should match the head of customer_analysis"
+    assert low_performing_products(transactions, 30, n=2) == low_performing_products(transactions, 30)[:2], \
+        "Bottom-N low performers should match the head of the full list"
+
+    print("✓ Top-N selection PASSED")
+
+
+def test_refresh_aggregates(tmp_path):
+    """Saved totals plus appended rows equal totals over the whole file"""
+    print("\n" + "="*70)
+    print("TEST: Incremental aggregates")
+    print("="*70)
+
+    data_file = os.path.join(tmp_path, 'sales.txt')
+    state_file = os.path.join(tmp_path, 'state.json')
+    with open(DATA_FILE, 'rb') as f:
+        content = f.read()
+
+    # First run sees half the file, ending in a partially written line
+    cut = content.index(b'\n', len(content) // 2) + 10
+    with open(data_file, 'wb') as f:
+        f.write(content[:cut])
+    first = refresh_aggregates(data_file, state_file)
+
+    with open(data_file, 'wb') as f:
+        f.write(content)
+    second = refresh_aggregates(data_file, state_file)
+    full = SalesAggregates(TransactionTable.from_records(load_transactions()))
+
+    assert first.total[1] < full.total[1], "First run should only see part of the file"
+    assert second.total[1] == full.total[1], "Second run should cover every row"
+    assert second.daily_sales_trend() == full.daily_sales_trend(), "Daily trend should match"
+    assert second.customer_analysis().keys() == full.customer_analysis().keys(), "Customers should match"
+    for region, data in full.region_wise_sales().items():
+        assert abs(second.region_wise_sales()[region]['total_sales'] - data['total_sales']) < 1e-6, \
+            "Region totals should match"
+
+    # A complete last record without a newline is counted, but only once
+    without_newline = os.path.join(tmp_path, 'no_newline.txt')
+    no_newline_state = os.path.join(tmp_path, 'no_newline.json')
+    with open(without_newline, 'wb') as f:
+        f.write(content.rstrip(b'\r\n'))
+    unterminated = refresh_aggregates(without_newline, no_newline_state)
+    assert unterminated.total[1] == full.total[1], "Unterminated last record should be included"
+    with open(without_newline, 'ab') as f:
+        f.write(b'\n')
+    terminated = refresh_aggregates(without_newline, no_newline_state)
+    assert terminated.total[1] == full.total[1], "Last record should not be counted twice"
+    assert terminated.daily_sales_trend() == full.daily_sales_trend(), "Daily trend should match"
+
+    # A replaced file is detected and rebuilt instead of double counted
+    with open(data_file, 'wb') as f:
+        f.write(content.replace(b'T0', b'T9', 1))
+    rebuilt = refresh_aggregates(data_file, state_file)
+    assert rebuilt.total[1] == full.total[1], "Changed file should be re-aggregated from scratch"
+
+    print("✓ Incremental aggregates PASSED")
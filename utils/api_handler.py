@@ -1,54 +1,156 @@
 import requests
 
 import pandas as pd
+import numpy as np
+import urllib.parse
 import urllib.request
 import json
+import bisect
+import datetime
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.category_matcher import CategoryRules, read_category_rules
+from utils.file_handler import write_outputs
+
+
+CATEGORY_RULES_FILE = os.path.join("data", "category_rules.txt")
+
+# Built-in rules, used when the rules file is missing: (priority, match type, pattern, category)
+CATEGORY_RULES = [
+    (10, 'keyword', 'laptop', 'Computers'),
+    (20, 'keyword', 'mouse', 'Peripherals'),
+    (21, 'keyword', 'keyboard', 'Peripherals'),
+    (30, 'keyword', 'monitor', 'Display Devices'),
+    (31, 'keyword', 'webcam', 'Display Devices'),
+    (40, 'keyword', 'headphone', 'Audio Equipment'),
+    (50, 'keyword', 'cable', 'Accessories'),
+    (51, 'keyword', 'charger', 'Accessories'),
+    (60, 'keyword', 'hard drive', 'Storage Devices'),
+]
+
+DEFAULT_CATEGORY = 'Electronics'
+
+_category_rules = None
+
+
+def load_category_rules(rules_file=CATEGORY_RULES_FILE):
+    """
+    Compile the category rules file and use it for categorize_product
+    Returns: CategoryRules
+    """
+    global _category_rules
+    
+    if os.path.exists(rules_file):
+        rules = read_category_rules(rules_file)
+        print(f"Loaded {rules.rule_count} category rules from '{rules_file}'")
+    else:
+        print(f"Category rules file '{rules_file}' not found - using built-in rules")
+        rules = CategoryRules(CATEGORY_RULES, DEFAULT_CATEGORY)
+    
+    _category_rules = rules
+    _categorize_name.cache_clear()
+    return rules
+
+
+@functools.lru_cache(maxsize=65536)
+def _categorize_name(name):
+    rules = _category_rules or load_category_rules()
+    return rules.categorize(name)
 
 
 def categorize_product(product_name):
     """
     Categorize product based on name
     """
-    name = str(product_name).lower()
-    
-    if 'laptop' in name:
-        return 'Computers'
-    elif 'mouse' in name or 'keyboard' in name:
-        return 'Peripherals'
-    elif 'monitor' in name or 'webcam' in name:
-        return 'Display Devices'
-    elif 'headphone' in name:
-        return 'Audio Equipment'
-    elif 'cable' in name or 'charger' in name:
-        return 'Accessories'
-    elif 'hard drive' in name:
-        return 'Storage Devices'
-    else:
-        return 'Electronics'
+    return _categorize_name(str(product_name))
 
 
 def enrich_with_categories(df):
     """
-    Add product categories using pandas apply
+    Add product categories, matching each distinct product name only once
     """
     print("Adding product categories...")
     
-    # Use pandas apply - applies function to each row
-    df['Category'] = df['ProductName'].apply(categorize_product)
+    # Categorize the unique names, then broadcast back to the rows by code
+    codes, names = pd.factorize(df['ProductName'], use_na_sentinel=False)
+    categories = np.array([categorize_product(name) for name in names], dtype=object)
+    df['Category'] = categories[codes]
     
     print(f"Categories added to {len(df)} products\n")
     return df
 
 
-def fetch_exchange_rates():
+# =========================
+# EXCHANGE RATES
+# =========================
+
+# Currency every rate is quoted against (the currency of the sales data)
+BASE_CURRENCY = 'USD'
+
+LATEST_RATES_URL = f"https://api.exchangerate-api.com/v4/latest/{BASE_CURRENCY}"
+
+# Historical rates; /{start}..{end}?from=USD&to=... returns one quote per business day
+HISTORICAL_RATES_URL = "https://api.frankfurter.app"
+
+EXCHANGE_RATE_FILE = os.path.join(".cache", "exchange_rates.json")
+
+RATE_CURRENCIES = ['EUR', 'GBP', 'INR']
+
+DEFAULT_RATES = {'EUR': 0.92, 'GBP': 0.79, 'INR': 83.12, 'date': '2024-12-01'}
+
+# Seconds the latest rates are reused before the API is asked again
+LATEST_RATES_TTL = 12 * 60 * 60
+
+# In-process copy of each rate store file:
+# {'latest': {currency: rate, 'date': ..., 'fetched_at': ...},
+#  'daily': {date: {currency: rate}},   (only rates the API actually quoted)
+#  'no_quote': [date, ...]}             (settled dates with no quote, e.g. weekends)
+_rate_stores = {}
+
+
+def _load_rate_store(store_file):
+    store = _rate_stores.get(store_file)
+    if store is None:
+        try:
+            with open(store_file, 'r', encoding='utf-8') as f:
+                store = json.load(f)
+        except (OSError, ValueError):
+            store = {'latest': None, 'daily': {}}
+        store.setdefault('no_quote', [])
+        _rate_stores[store_file] = store
+    return store
+
+
+def _save_rate_store(store_file):
+    os.makedirs(os.path.dirname(store_file) or '.', exist_ok=True)
+    temp_file = store_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(_rate_stores[store_file], f)
+    os.replace(temp_file, store_file)
+
+
+def fetch_exchange_rates(store_file=EXCHANGE_RATE_FILE, max_age=LATEST_RATES_TTL, url=LATEST_RATES_URL):
     """
     Fetch current exchange rates from API
+    
+    Rates younger than max_age are served from the in-process / on-disk
+    rate store without a network call. If the API is unreachable, the last
+    stored rates (or DEFAULT_RATES) are used.
     """
+    store = _load_rate_store(store_file)
+    latest = store.get('latest')
+    
+    if latest and time.time() - latest['fetched_at'] < max_age:
+        print(f"Using cached exchange rates from {latest['date']}\n")
+        return {key: latest[key] for key in RATE_CURRENCIES + ['date']}
+    
     print("Fetching exchange rates...")
     
     try:
-        url = "https://api.exchangerate-api.com/v4/latest/USD"
-        
         with urllib.request.urlopen(url, timeout=10) as response:
             data = json.loads(response.read().decode())
             
@@ -58,31 +160,219 @@ def fetch_exchange_rates():
                 'INR': data['rates'].get('INR'),
                 'date': data.get('date')
             }
-            print("Exchange rates fetched successfully\n")
-            return rates
+        
+        store['latest'] = dict(rates, fetched_at=time.time())
+        if rates['date']:
+            store['daily'].setdefault(rates['date'], {}).update(
+                {currency: rates[currency] for currency in RATE_CURRENCIES}
+            )
+        _save_rate_store(store_file)
+        
+        print("Exchange rates fetched successfully\n")
+        return rates
     
-    except urllib.error.URLError:
-        print("Could not connect to API - using default rates\n")
-        return {'EUR': 0.92, 'GBP': 0.79, 'INR': 83.12, 'date': '2024-12-01'}
     except Exception as e:
-        print(f"API error: {e} - using default rates\n")
-        return {'EUR': 0.92, 'GBP': 0.79, 'INR': 83.12, 'date': '2024-12-01'}
+        fallback = {key: latest[key] for key in RATE_CURRENCIES + ['date']} if latest else dict(DEFAULT_RATES)
+        if isinstance(e, urllib.error.URLError):
+            print(f"Could not connect to API - using rates from {fallback['date']}\n")
+        else:
+            print(f"API error: {e} - using rates from {fallback['date']}\n")
+        return fallback
+
+
+def _fetch_rate_range(url, start, end, currencies):
+    """Historical BASE_CURRENCY rates between two ISO dates as {date: {currency: rate}}"""
+    query = urllib.parse.urlencode({'from': BASE_CURRENCY, 'to': ','.join(currencies)})
+    with urllib.request.urlopen(f"{url}/{start}..{end}?{query}", timeout=10) as response:
+        return json.loads(response.read().decode())['rates']
+
+
+def _iso_date(value):
+    """ISO date string (YYYY-MM-DD) of a date, timestamp or string, or None if it has none"""
+    try:
+        return datetime.date.fromisoformat(str(value)[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def _rate_on(daily, sorted_dates, date, currency):
+    """Rate quoted on date, else on the closest earlier (then later) date, else the default"""
+    position = bisect.bisect_right(sorted_dates, date)
+    for candidate in reversed(sorted_dates[:position]):
+        if currency in daily[candidate]:
+            return daily[candidate][currency]
+    for candidate in sorted_dates[position:]:
+        if currency in daily[candidate]:
+            return daily[candidate][currency]
+    return DEFAULT_RATES[currency]
+
+
+def get_exchange_rates(dates, currencies=RATE_CURRENCIES, store_file=EXCHANGE_RATE_FILE,
+                       url=HISTORICAL_RATES_URL):
+    """
+    BASE_CURRENCY exchange rates for each date
+    Returns: {date: {currency: rate}} with ISO date strings as keys
+    
+    Rates come from the per-date rate store; dates it does not cover yet
+    are fetched in one range request and saved, so repeated runs over the
+    same dates make no network calls. Days without a quote (weekends,
+    holidays, API failures) use the closest earlier quote. Missing (NaT,
+    None) or unparseable dates are skipped and have no entry in the result.
+    
+    Only quoted rates are stored. A day without a quote is remembered as
+    such only once the API has quoted a later day; until then (e.g. today
+    before publication) it is requested again on the next run.
+    """
+    dates = {_iso_date(date) for date in dates}
+    dates.discard(None)
+    dates = sorted(dates)
+    store = _load_rate_store(store_file)
+    daily = store['daily']
+    no_quote = set(store['no_quote'])
+    
+    missing = [d for d in dates
+               if d not in no_quote and any(c not in daily.get(d, {}) for c in currencies)]
+    
+    if missing:
+        # Start a week early so a weekend at the start still has a prior quote,
+        # and end up to a week late so a later quote settles days without one
+        first = datetime.date.fromisoformat(missing[0])
+        last = datetime.date.fromisoformat(missing[-1])
+        range_start = (first - datetime.timedelta(days=7)).isoformat()
+        range_end = max(last, min(last + datetime.timedelta(days=7), datetime.date.today())).isoformat()
+        print(f"Fetching exchange rates for {len(missing)} dates...")
+        try:
+            fetched = _fetch_rate_range(url, range_start, range_end, currencies)
+            for date, rates in fetched.items():
+                daily.setdefault(date, {}).update(rates)
+            
+            if fetched:
+                newest = max(fetched)
+                no_quote.update(d for d in missing if d < newest and d not in fetched)
+                store['no_quote'] = sorted(no_quote)
+            _save_rate_store(store_file)
+            print("Exchange rates fetched successfully\n")
+        except Exception as e:
+            print(f"Could not fetch historical rates: {e} - using closest known rates\n")
+    
+    sorted_dates = sorted(daily)
+    return {
+        date: {c: _rate_on(daily, sorted_dates, date, c) for c in currencies}
+        for date in dates
+    }
     
 
 # =========================
 # TASK 3.1 – API FUNCTIONS
 # =========================
 
-def fetch_all_products():
-    url = "https://dummyjson.com/products?limit=100"
-    products = []
+# Product catalog endpoint; pages are requested with ?limit=&skip=
+PRODUCTS_URL = "https://dummyjson.com/products"
 
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+# HTTP statuses worth retrying (rate limiting and transient server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _get(session, url, params, retries=3, backoff=0.5, timeout=10, headers=None):
+    """
+    GET a URL, retrying connection errors, timeouts and RETRY_STATUSES
+    with exponential backoff (backoff, 2*backoff, ...)
+    Returns: the response (raises for other 4xx/5xx statuses)
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, timeout=timeout, headers=headers)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response
+
+        time.sleep(backoff * (2 ** attempt))
+
+
+def _make_session(max_workers):
+    """requests session whose connection pool fits max_workers concurrent requests"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _page_validators(page):
+    """If-None-Match / If-Modified-Since headers for a cached page, or None"""
+    headers = {}
+    if page.get("etag"):
+        headers["If-None-Match"] = page["etag"]
+    if page.get("last_modified"):
+        headers["If-Modified-Since"] = page["last_modified"]
+    return headers or None
+
+
+def _catalog_unchanged(session, url, cached, max_workers, retries, backoff):
+    """
+    True only when every cached page answers 304 Not Modified and no page
+    exists past the cached total (a 304 on one page says nothing about the
+    others, and appended products only show up past the last page)
+    """
+    pages = cached.get("pages") or []
+    validators = [_page_validators(page) for page in pages]
+    if not pages or None in validators:
+        return False
+
+    requests_to_send = [({"limit": page["limit"], "skip": page["skip"]}, headers)
+                        for page, headers in zip(pages, validators)]
+    requests_to_send.append(({"limit": 1, "skip": cached["total"]}, None))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        responses = list(executor.map(
+            lambda request: _get(session, url, request[0], retries, backoff, headers=request[1]),
+            requests_to_send
+        ))
+
+    *page_responses, past_end = responses
+    if any(response.status_code != 304 for response in page_responses):
+        return False
+    past_end_page = past_end.json()
+    return past_end_page.get("total") == cached["total"] and not past_end_page.get("products")
 
-        for item in data.get("products", []):
+
+def _fetch_catalog(url, page_size, max_workers, retries, backoff, cached=None):
+    """
+    Download every catalog page
+    Returns: tuple (products, catalog_info); catalog_info holds the total and
+    each page's skip, limit and validators. products is None when cached
+    catalog_info was given and the whole catalog is unchanged.
+    """
+    with _make_session(max_workers) as session:
+        if cached and _catalog_unchanged(session, url, cached, max_workers, retries, backoff):
+            return None, cached
+
+        first_response = _get(session, url, {"limit": page_size, "skip": 0}, retries, backoff)
+        first_page = first_response.json()
+
+        total = first_page.get("total", len(first_page.get("products", [])))
+        # Servers may cap the page size below the requested limit, so step
+        # by the size actually returned rather than by page_size
+        step = first_page.get("limit") or len(first_page.get("products", [])) or page_size
+        skips = range(step, total, step)
+
+        responses = [first_response]
+        if skips:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                responses.extend(executor.map(
+                    lambda skip: _get(session, url, {"limit": step, "skip": skip},
+                                      retries, backoff),
+                    skips
+                ))
+
+    pages = [first_page] + [response.json() for response in responses[1:]]
+    products = []
+    for page in pages:
+        for item in page.get("products", []):
             products.append({
                 "id": item.get("id"),
                 "title": item.get("title"),
@@ -92,8 +382,35 @@ def fetch_all_products():
                 "rating": item.get("rating")
             })
 
-        print(f"API SUCCESS: {len(products)} products fetched")
+    if len(products) != total:
+        raise ValueError(f"Catalog reports {total} products but {len(products)} were fetched")
 
+    catalog_info = {
+        "total": total,
+        "pages": [
+            {"skip": skip, "limit": limit,
+             "etag": response.headers.get("ETag"),
+             "last_modified": response.headers.get("Last-Modified")}
+            for skip, limit, response in zip(
+                [0, *skips], [page_size] + [step] * len(skips), responses
+            )
+        ]
+    }
+    return products, catalog_info
+
+
+def fetch_all_products(url=PRODUCTS_URL, page_size=100, max_workers=8, retries=3, backoff=0.5):
+    """
+    Fetch the whole product catalog, page by page
+    
+    The first page reports the catalog total; the remaining pages are then
+    requested concurrently (at most max_workers at a time) over one pooled
+    session, so a large catalog loads in about one round trip per
+    max_workers pages. Returns [] if any page cannot be fetched.
+    """
+    try:
+        products, _ = _fetch_catalog(url, page_size, max_workers, retries, backoff)
+        print(f"API SUCCESS: {len(products)} products fetched")
     except Exception as e:
         print("API ERROR: Unable to fetch products:", e)
         return []
@@ -101,6 +418,120 @@ def fetch_all_products():
     return products
 
 
+# =========================
+# PRODUCT CATALOG CACHE
+# =========================
+
+CATALOG_CACHE_FILE = os.path.join(".cache", "product_catalog.json")
+
+# Seconds a cached catalog is used without contacting the API
+CATALOG_TTL = 24 * 60 * 60
+
+# Seconds past the TTL during which the cached catalog is still returned
+# immediately while a background thread revalidates it
+CATALOG_STALE_WHILE_REVALIDATE = 7 * 24 * 60 * 60
+
+_catalog_refresh_thread = None
+
+
+def _read_catalog_cache(cache_file):
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_catalog_cache(cache_file, cache):
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    temp_file = f"{cache_file}.{threading.get_ident()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(temp_file, cache_file)
+
+
+def _revalidate_catalog(cache, cache_file, url, fetch_options):
+    """
+    Conditionally re-download the catalog and update the cache file
+    Every cached page is revalidated; any change refetches the whole catalog
+    Returns: the new cache contents
+    """
+    products, catalog_info = _fetch_catalog(url, cached=cache, **fetch_options)
+
+    if products is None:
+        print("API SUCCESS: Product catalog not modified")
+        cache = dict(cache, fetched_at=time.time())
+    else:
+        print(f"API SUCCESS: {len(products)} products fetched")
+        cache = dict(catalog_info, url=url, fetched_at=time.time(), products=products)
+
+    _write_catalog_cache(cache_file, cache)
+    return cache
+
+
+def _revalidate_in_background(cache, cache_file, url, fetch_options):
+    try:
+        _revalidate_catalog(cache, cache_file, url, fetch_options)
+    except Exception as e:
+        print("API ERROR: Background catalog refresh failed:", e)
+
+
+def load_product_catalog(cache_file=CATALOG_CACHE_FILE, ttl=CATALOG_TTL,
+                         stale_while_revalidate=CATALOG_STALE_WHILE_REVALIDATE,
+                         url=PRODUCTS_URL, page_size=100, max_workers=8, retries=3, backoff=0.5):
+    """
+    Product catalog (same format as fetch_all_products) served from an on-disk cache
+    
+    - younger than ttl: returned from the cache, no network access
+    - within stale_while_revalidate after that: returned from the cache while
+      a background thread revalidates it (see wait_for_catalog_refresh)
+    - older: revalidated first with each page's If-None-Match /
+      If-Modified-Since, so an unchanged catalog costs one 304 per page
+      instead of a full download; a change on any page refetches it all
+    If the API cannot be reached, a cached catalog of any age is used.
+    """
+    global _catalog_refresh_thread
+
+    fetch_options = {"page_size": page_size, "max_workers": max_workers,
+                     "retries": retries, "backoff": backoff}
+    cache = _read_catalog_cache(cache_file)
+    if cache and cache.get("url") != url:
+        cache = None
+
+    if cache:
+        age = time.time() - cache["fetched_at"]
+
+        if age < ttl:
+            print(f"Using cached product catalog ({len(cache['products'])} products, "
+                  f"{age / 3600:.1f}h old)")
+            return cache["products"]
+
+        if age < ttl + stale_while_revalidate:
+            print(f"Using stale product catalog ({age / 3600:.1f}h old) - refreshing in background")
+            _catalog_refresh_thread = threading.Thread(
+                target=_revalidate_in_background,
+                args=(cache, cache_file, url, fetch_options),
+                daemon=True
+            )
+            _catalog_refresh_thread.start()
+            return cache["products"]
+
+    try:
+        return _revalidate_catalog(cache, cache_file, url, fetch_options)["products"]
+    except Exception as e:
+        if cache:
+            print("API ERROR: Unable to refresh products, using cached catalog:", e)
+            return cache["products"]
+        print("API ERROR: Unable to fetch products:", e)
+        return []
+
+
+def wait_for_catalog_refresh(timeout=None):
+    """Block until a background catalog refresh (if any) has finished"""
+    if _catalog_refresh_thread is not None:
+        _catalog_refresh_thread.join(timeout)
+
+
 def create_product_mapping(api_products):
     mapping = {}
 
@@ -119,65 +550,80 @@ def create_product_mapping(api_products):
 # TASK 3.2 – DATA ENRICHMENT
 # =========================
 
-def enrich_sales_data(transactions, product_mapping):
-    enriched = []
+ENRICHMENT_COLUMNS = ["API_Category", "API_Brand", "API_Rating", "API_Match"]
 
-    for txn in transactions:
-        new_txn = txn.copy()
+ENRICHED_DATA_FILE = os.path.join("data", "enriched_sales_data.txt")
 
-        try:
-            product_num = int(txn["ProductID"].replace("P", ""))
-
-            if product_num in product_mapping:
-                api_data = product_mapping[product_num]
-                new_txn["API_Category"] = api_data["category"]
-                new_txn["API_Brand"] = api_data["brand"]
-                new_txn["API_Rating"] = api_data["rating"]
-                new_txn["API_Match"] = True
-            else:
-                new_txn["API_Category"] = None
-                new_txn["API_Brand"] = None
-                new_txn["API_Rating"] = None
-                new_txn["API_Match"] = False
-
-        except Exception:
-            new_txn["API_Category"] = None
-            new_txn["API_Brand"] = None
-            new_txn["API_Rating"] = None
-            new_txn["API_Match"] = False
-
-        enriched.append(new_txn)
-
-    save_enriched_data(enriched)
+
+def _product_number(product_id):
+    """Numeric API id of a ProductID such as 'P101', or None if it has none"""
+    try:
+        return int(product_id.replace("P", ""))
+    except Exception:
+        return None
+
+
+def _join_products(product_ids, product_mapping):
+    """
+    Look up each distinct ProductID in the product mapping
+    Returns: list of (category, brand, rating, matched) tuples, one per id
+    """
+    joined = []
+    for product_id in product_ids:
+        api_data = product_mapping.get(_product_number(product_id))
+        if api_data is None:
+            joined.append((None, None, None, False))
+        else:
+            joined.append((api_data["category"], api_data["brand"], api_data["rating"], True))
+    return joined
+
+
+def enrich_sales_data(transactions, product_mapping, output_file=ENRICHED_DATA_FILE):
+    """
+    Left-join transactions with the API product mapping on ProductID
+    Returns: enriched DataFrame for a DataFrame, enriched dicts for a list of dicts
+    output_file: path or list of paths the result is saved to (see save_enriched_data)
+    
+    Each distinct ProductID is parsed and looked up once; the joined values
+    are then broadcast to the rows through their factorized ProductID codes.
+    """
+    is_frame = isinstance(transactions, pd.DataFrame)
+    product_ids = transactions["ProductID"] if is_frame else \
+        pd.Series([txn["ProductID"] for txn in transactions], dtype=object)
+    
+    codes, unique_ids = pd.factorize(product_ids, use_na_sentinel=False)
+    joined = _join_products(unique_ids, product_mapping)
+    
+    if is_frame:
+        columns = np.array(joined, dtype=object).reshape(len(joined), len(ENRICHMENT_COLUMNS))[codes]
+        api_columns = pd.DataFrame(columns, index=transactions.index, columns=ENRICHMENT_COLUMNS)
+        enriched = pd.concat([transactions, api_columns.infer_objects()], axis=1)
+    else:
+        fields = [dict(zip(ENRICHMENT_COLUMNS, values)) for values in joined]
+        enriched = [{**txn, **fields[code]} for txn, code in zip(transactions, codes.tolist())]
+    
+    save_enriched_data(enriched, output_file)
     return enriched
 
 
-def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt"):
-    header = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
-
-    with open(filename, "w", encoding="utf-8") as file:
-        file.write("|".join(header) + "\n")
-
-        for txn in enriched_transactions:
-            row = [
-                str(txn.get("TransactionID")),
-                str(txn.get("Date")),
-                str(txn.get("ProductID")),
-                str(txn.get("ProductName")),
-                str(txn.get("Quantity")),
-                str(txn.get("UnitPrice")),
-                str(txn.get("CustomerID")),
-                str(txn.get("Region")),
-                str(txn.get("API_Category") or ""),
-                str(txn.get("API_Brand") or ""),
-                str(txn.get("API_Rating") or ""),
-                str(txn.get("API_Match"))
-            ]
-            file.write("|".join(row) + "\n")
-
-    print(f"File saved: {filename}")
+ENRICHED_COLUMNS = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region"
+] + ENRICHMENT_COLUMNS
+
+
+def save_enriched_data(enriched_transactions, filename=ENRICHED_DATA_FILE):
+    """
+    Save enriched transactions (DataFrame or list of dicts) pipe-delimited
+    filename may be a list of paths to also write CSV or columnar copies
+    (see write_outputs); missing API values are written empty
+    """
+    if isinstance(enriched_transactions, pd.DataFrame):
+        enriched_df = enriched_transactions.reindex(columns=ENRICHED_COLUMNS)
+    else:
+        enriched_df = pd.DataFrame.from_records(enriched_transactions, columns=ENRICHED_COLUMNS)
+
+    file_paths = [filename] if isinstance(filename, str) else list(filename)
+    for path in write_outputs(enriched_df, file_paths):
+        print(f"File saved: {path}")
 
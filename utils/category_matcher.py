@@ -0,0 +1,180 @@
+"""
+Keyword matching for product categorization
+
+KeywordMatcher compiles a priority-ordered list of (keyword, category)
+rules into one Aho-Corasick automaton, so a name is scanned once no matter
+how many keywords there are, and the highest-priority keyword found in it
+decides the category. CategoryRules adds exact-name rules, ranked by the
+same priorities, and is loaded from a rules file (data/category_rules.txt).
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive substring rules evaluated in a single pass per name
+
+    rules: (keyword, category) pairs, highest priority first. match() returns
+    the category of the first rule whose keyword occurs anywhere in the
+    name, exactly like a chain of `if keyword in name` checks, or default.
+    """
+
+    def __init__(self, rules, default):
+        self.default = default
+        self._categories = []
+        self._goto = [{}]
+        self._fail = [0]
+        # Lowest rule index ending at each state (including via failure links)
+        self._best = [None]
+
+        for keyword, category in rules:
+            index = len(self._categories)
+            self._categories.append(category)
+
+            state = 0
+            for char in keyword.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                    self._goto[state][char] = next_state
+                state = next_state
+
+            if self._best[state] is None:
+                self._best[state] = index
+
+        self._link_failures()
+
+    def _link_failures(self):
+        """Breadth-first pass setting each state's longest proper suffix state"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                suffix = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = suffix if suffix != next_state else 0
+
+                inherited = self._best[self._fail[next_state]]
+                if inherited is not None and (self._best[next_state] is None or
+                                              inherited < self._best[next_state]):
+                    self._best[next_state] = inherited
+
+    def find(self, name):
+        """Index of the highest-priority rule whose keyword is in name, else None"""
+        goto = self._goto
+        fail = self._fail
+        best_state = self._best
+        best = None
+        state = 0
+
+        for char in str(name).lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            found = best_state[state]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+
+        return best
+
+    def match(self, name):
+        """Category of the highest-priority keyword in name, else the default"""
+        best = self.find(name)
+        return self.default if best is None else self._categories[best]
+
+
+MATCH_TYPES = ('exact', 'keyword', 'default')
+
+
+class CategoryRules:
+    """
+    Compiled category rule table
+
+    rules: (priority, match_type, pattern, category) tuples. Exact-name
+    rules are looked up in a dictionary and keyword rules are compiled,
+    lowest priority number first, into one KeywordMatcher. When both match,
+    the rule with the lower priority number wins (ties go to the rule listed
+    first), so an exact rule does not override a more important keyword.
+    The cost of categorizing a name does not grow with the number of rules.
+    The default rule with the lowest priority number (if any) replaces
+    default; rule_count counts the exact and keyword rules only.
+    """
+
+    def __init__(self, rules, default='Electronics'):
+        # Exact names map to (rank, category); rank is the rule's position in
+        # priority order, also kept for each keyword rule to compare the two
+        self.exact = {}
+        keywords = []
+        self._keyword_ranks = []
+        rule_default = None
+
+        ordered = sorted(rules, key=lambda rule: rule[0])
+        for rank, (priority, match_type, pattern, category) in enumerate(ordered):
+            if match_type == 'exact':
+                self.exact.setdefault(pattern.strip().lower(), (rank, category))
+            elif match_type == 'keyword':
+                keywords.append((pattern, category))
+                self._keyword_ranks.append(rank)
+            elif rule_default is None:
+                rule_default = category
+
+        self.default = default if rule_default is None else rule_default
+        self.rule_count = len(self.exact) + len(keywords)
+        self._keywords = keywords
+        self._matcher = KeywordMatcher(keywords, self.default)
+
+    def categorize(self, name):
+        """Category for one product name"""
+        exact = self.exact.get(str(name).strip().lower())
+        # No keyword scan needed when the exact rule outranks every keyword
+        if exact is not None and (not self._keyword_ranks or exact[0] < self._keyword_ranks[0]):
+            return exact[1]
+
+        keyword = self._matcher.find(name)
+        if exact is not None and (keyword is None or exact[0] < self._keyword_ranks[keyword]):
+            return exact[1]
+        return self.default if keyword is None else self._keywords[keyword][1]
+
+
+def read_category_rules(filename):
+    """
+    Read a pipe-delimited rules file into CategoryRules
+    Format: Priority|MatchType|Pattern|Category (header and # comments skipped)
+    Invalid lines are reported and skipped.
+    """
+    rules = []
+
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#') or line.startswith('Priority|'):
+                continue
+
+            fields = [field.strip() for field in line.split('|')]
+            try:
+                priority, match_type, pattern, category = fields
+                priority = int(priority)
+            except ValueError:
+                print(f"Skipping invalid category rule on line {line_number}: {line}")
+                continue
+
+            match_type = match_type.lower()
+            if match_type not in MATCH_TYPES or not category or \
+                    (match_type != 'default' and not pattern):
+                print(f"Skipping invalid category rule on line {line_number}: {line}")
+                continue
+
+            rules.append((priority, match_type, pattern, category))
+
+    return CategoryRules(rules)
@@ -1,13 +1,32 @@
 import pandas as pd
 import numpy as np
 
+from utils.sketches import HEAVY_HITTERS_CAPACITY, HLL_PRECISION, QUANTILE_SKETCH_K, SalesSketch
+
+
+def _text_column(series):
+    """
+    A column as strings for the .str accessor
+    String and categorical columns are used as-is instead of converted
+    (on a categorical, .str works on the distinct values only)
+    """
+    if isinstance(series.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+        return series
+    return series.astype(str)
+
 
 def clean_numeric_column(series):
     """
     Clean numeric data - remove commas and convert to float
     Uses pandas string operations
+    
+    Columns that read_sales_data already parsed as numbers (it strips
+    thousands separators while reading) are returned unchanged.
     """
-    cleaned = series.astype(str).str.replace(',', '')
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    
+    cleaned = _text_column(series).str.replace(',', '', regex=False)
     return pd.to_numeric(cleaned, errors='coerce')
 
 
@@ -15,64 +34,144 @@ def validate_and_clean(df):
     """
     Validate and clean sales data using pandas
     Returns: valid_df, invalid_df
+    
+    Each rule is evaluated once over the whole column; a row's Reason is
+    the first rule it fails. Only the valid and invalid subsets are built,
+    so the input is never copied as a whole.
     """
     print("Cleaning and validating data...")
     
-    # Make a copy
-    data = df.copy()
-    
     # Clean numeric columns
-    data['Quantity'] = clean_numeric_column(data['Quantity'])
-    data['UnitPrice'] = clean_numeric_column(data['UnitPrice'])
-    
-    # Create validation tracking columns
-    data['Valid'] = True
-    data['Reason'] = ''
-    
-    # Rule 1: TransactionID must start with 'T'
-    mask_id = ~data['TransactionID'].astype(str).str.startswith('T')
-    data.loc[mask_id, 'Valid'] = False
-    data.loc[mask_id, 'Reason'] = 'Invalid TransactionID format'
-    
-    # Rule 2: Quantity must be positive
-    mask_qty = (data['Quantity'].isna()) | (data['Quantity'] <= 0)
-    data.loc[mask_qty & data['Valid'], 'Valid'] = False
-    data.loc[mask_qty & data['Valid'], 'Reason'] = 'Invalid quantity'
-    
-    # Rule 3: UnitPrice must be non-negative
-    mask_price = (data['UnitPrice'].isna()) | (data['UnitPrice'] < 0)
-    data.loc[mask_price & data['Valid'], 'Valid'] = False
-    data.loc[mask_price & data['Valid'], 'Reason'] = 'Invalid price'
-    
-    # Rule 4: CustomerID must exist
-    mask_cust = data['CustomerID'].astype(str).str.strip() == ''
-    data.loc[mask_cust & data['Valid'], 'Valid'] = False
-    data.loc[mask_cust & data['Valid'], 'Reason'] = 'Missing CustomerID'
-    
-    # Rule 5: Region must exist
-    mask_region = data['Region'].astype(str).str.strip() == ''
-    data.loc[mask_region & data['Valid'], 'Valid'] = False
-    data.loc[mask_region & data['Valid'], 'Reason'] = 'Missing Region'
+    quantity = clean_numeric_column(df['Quantity'])
+    unit_price = clean_numeric_column(df['UnitPrice'])
+    
+    rules = [
+        # Rule 1: TransactionID must start with 'T'
+        (~_text_column(df['TransactionID']).str.startswith('T', na=False),
+         'Invalid TransactionID format'),
+        # Rule 2: Quantity must be positive
+        (quantity.isna() | (quantity <= 0), 'Invalid quantity'),
+        # Rule 3: UnitPrice must be non-negative
+        (unit_price.isna() | (unit_price < 0), 'Invalid price'),
+        # Rule 4: CustomerID must exist
+        (_text_column(df['CustomerID']).str.strip().eq(''), 'Missing CustomerID'),
+        # Rule 5: Region must exist
+        (_text_column(df['Region']).str.strip().eq(''), 'Missing Region'),
+    ]
+    masks = [mask.to_numpy(dtype=bool, na_value=False) for mask, _ in rules]
+    
+    # First failing rule per row ('' when every rule passes)
+    reasons = np.select(masks, [reason for _, reason in rules], default='')
+    invalid = np.logical_or.reduce(masks)
+    valid = ~invalid
+    
+    columns = {name: df[name] for name in df.columns}
+    columns['Quantity'] = quantity
+    columns['UnitPrice'] = unit_price
     
     # Split into valid and invalid
-    valid_df = data[data['Valid']].copy()
-    invalid_df = data[~data['Valid']].copy()
+    valid_df = pd.DataFrame({name: values[valid] for name, values in columns.items()})
+    invalid_df = pd.DataFrame({name: values[invalid] for name, values in columns.items()})
+    invalid_df['Valid'] = False
+    invalid_df['Reason'] = reasons[invalid]
     
     # Calculate TotalPrice for valid records
     valid_df['TotalPrice'] = valid_df['Quantity'] * valid_df['UnitPrice']
     
-    # Remove validation columns from valid data
-    valid_df = valid_df.drop(['Valid', 'Reason'], axis=1)
-    
     print(f"Valid transactions: {len(valid_df)}")
     print(f"Invalid transactions: {len(invalid_df)}\n")
     
     return valid_df, invalid_df
 
 
+def convert_revenue(df, date_rates, currencies, amount_column='TotalPrice'):
+    """
+    Convert an amount column into several currencies at each row's date rate
+    date_rates: {date: {currency: rate}} (see get_exchange_rates)
+    Returns: DataFrame with the columns of df plus {amount_column}_{currency}
+    
+    Rates are looked up once per distinct date and broadcast to the rows, so
+    every currency is converted in a single array multiplication. Dates
+    without a rate use the closest earlier rate (else the closest later
+    one) and are reported; rows without a date and currencies with no rates
+    at all convert to NaN.
+    """
+    currencies = list(currencies)
+    rate_table = pd.DataFrame.from_dict(date_rates, orient='index').reindex(columns=currencies)
+    rate_table.index = rate_table.index.astype(str).str[:10]
+    
+    # Rows without a date (NaT, None) get no rate rather than a neighbour's
+    has_date = df['Date'].notna().to_numpy()
+    date_codes, dates = pd.factorize(df['Date'].astype(str).str[:10].where(has_date))
+    dates = pd.Index(dates)
+    
+    undated = len(df) - int(has_date.sum())
+    if undated:
+        print(f"No date for {undated} rows - their converted revenue will be missing")
+    
+    unrated = dates.difference(rate_table.dropna(how='all').index)
+    if len(unrated):
+        print(f"No exchange rate for {len(unrated)} dates ({', '.join(unrated[:5])}"
+              f"{', ...' if len(unrated) > 5 else ''}) - using the closest known rate")
+    no_rates = [currency for currency in currencies if rate_table[currency].isna().all()]
+    if no_rates:
+        print(f"No exchange rates for {', '.join(no_rates)} - converted revenue will be missing")
+    
+    # Carry rates forward (then backward) over dates, per currency
+    rate_table = rate_table.sort_index()
+    filled = rate_table.reindex(rate_table.index.union(dates)).ffill().bfill()
+    row_rates = np.full((len(df), len(currencies)), np.nan)
+    row_rates[has_date] = filled.reindex(dates).to_numpy(dtype=float)[date_codes[has_date]]
+    converted = df[amount_column].to_numpy(dtype=float)[:, None] * row_rates
+    
+    converted_columns = pd.DataFrame(
+        converted,
+        index=df.index,
+        columns=[f'{amount_column}_{currency}' for currency in currencies]
+    )
+    return pd.concat([df, converted_columns], axis=1)
+
+
+def revenue_breakdown(converted_df, by, currencies, base_currency, amount_column='TotalPrice'):
+    """
+    Revenue per group in the original and every converted currency
+    base_currency: label for the unconverted amounts (the rates' base currency)
+    Returns: DataFrame indexed by the group values, one column per currency
+    """
+    columns = [amount_column] + [f'{amount_column}_{currency}' for currency in currencies]
+    breakdown = converted_df.groupby(by, observed=True)[columns].sum()
+    breakdown.columns = [base_currency] + list(currencies)
+    return breakdown.sort_values(base_currency, ascending=False)
+
+
+def _group_codes(series):
+    """
+    Dense group numbers for a key column, in the sorted key order of groupby
+    Returns: tuple (codes, labels array-like); rows with a missing key get code -1
+    """
+    return pd.factorize(series, sort=True)
+
+
+def _group_sums(codes, group_count, values):
+    """Per-group sums of values, skipping rows without a group"""
+    has_group = codes >= 0
+    return np.bincount(codes[has_group], weights=values[has_group], minlength=group_count)
+
+
+def _top_groups(labels, sums, n):
+    """The n (label, sum) pairs with the largest sums; ties keep key order like nlargest"""
+    order = np.argsort(-sums, kind='stable')[:n]
+    return list(zip(labels[order].tolist(), sums[order]))
+
+
 def analyze_sales(df):
     """
     Analyze sales data using pandas and numpy
+    
+    TotalPrice and Quantity are read into arrays once; every statistic is
+    computed from those arrays, and each grouping key is factorized once and
+    reused for all of its per-group sums (np.bincount), instead of running a
+    separate pandas reduction or groupby per metric.
     """
     print("Analyzing sales data...")
     
@@ -80,39 +179,51 @@ def analyze_sales(df):
         print("No data to analyze")
         return {}
     
+    amounts = df['TotalPrice'].to_numpy(dtype=np.float64)
+    quantities = df['Quantity'].to_numpy()
+    
+    # Missing amounts are skipped, like pandas reductions
+    present = amounts[~np.isnan(amounts)]
+    amounts = np.where(np.isnan(amounts), 0.0, amounts)
+    
     # Basic revenue metrics
-    total_revenue = df['TotalPrice'].sum()
-    avg_transaction = df['TotalPrice'].mean()
-    median_transaction = df['TotalPrice'].median()
+    total_revenue = present.sum()
+    count = len(present)
+    avg_transaction = total_revenue / count if count else np.nan
+    median_transaction = np.median(present) if count else np.nan
     
     # Using numpy for statistics
-    std_dev = np.std(df['TotalPrice'])
-    min_trans = np.min(df['TotalPrice'])
-    max_trans = np.max(df['TotalPrice'])
-    total_units = np.sum(df['Quantity'])
+    std_dev = np.sqrt(np.square(present - avg_transaction).sum() / count) if count else np.nan
+    min_trans = present.min() if count else np.nan
+    max_trans = present.max() if count else np.nan
+    total_units = np.nansum(quantities)
     
-    # Sales by region using pandas groupby
-    region_sales = df.groupby('Region')['TotalPrice'].sum().to_dict()
+    # Sales by region
+    region_codes, regions = _group_codes(df['Region'])
+    region_totals = _group_sums(region_codes, len(regions), amounts)
+    region_sales = dict(zip(regions.tolist(), region_totals.tolist()))
     
-    # Product analysis using pandas
-    product_analysis = df.groupby('ProductName').agg({
-        'TotalPrice': 'sum',
-        'Quantity': 'sum'
-    }).rename(columns={'TotalPrice': 'revenue', 'Quantity': 'units'})
+    # Product analysis: revenue and units share the same product codes
+    product_codes, products = _group_codes(df['ProductName'])
+    product_revenue = _group_sums(product_codes, len(products), amounts)
+    # float64 sums with missing quantities skipped, as the groupby gave
+    product_units = _group_sums(product_codes, len(products),
+                                np.nan_to_num(quantities.astype(np.float64)))
     
     # Top 5 customers
-    top_customers = df.groupby('CustomerID')['TotalPrice'].sum().nlargest(5)
-    
-    # Top 5 products
-    top_products = product_analysis.nlargest(5, 'revenue')
+    customer_codes, customers = _group_codes(df['CustomerID'])
+    customer_totals = _group_sums(customer_codes, len(customers), amounts)
+    top_customers_list = _top_groups(customers, customer_totals, 5)
     
     print(f"Total Revenue: ${total_revenue:,.2f}")
     print(f"Transactions Analyzed: {len(df)}\n")
     
-    # Convert to list of tuples for reporting
-    top_customers_list = [(cust, spend) for cust, spend in top_customers.items()]
-    top_products_list = [(prod, {'revenue': row['revenue'], 'units': row['units']}) 
-                         for prod, row in top_products.iterrows()]
+    # Top 5 products, as (product, {'revenue': ..., 'units': ...}) for reporting
+    top = np.argsort(-product_revenue, kind='stable')[:5]
+    top_products_list = [
+        (product, {'revenue': product_revenue[i], 'units': product_units[i]})
+        for product, i in zip(products[top].tolist(), top)
+    ]
     
     return {
         'total_revenue': total_revenue,
@@ -126,4 +237,73 @@ def analyze_sales(df):
         'region_sales': region_sales,
         'top_customers': top_customers_list,
         'top_products': top_products_list
-    }
\ No newline at end of file
+    }
+
+
+STREAM_PERCENTILES = [0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def summarize_sales_sketch(sketch, percentiles=STREAM_PERCENTILES):
+    """
+    Sales statistics from a SalesSketch, with every key analyze_sales returns
+    
+    Three keys are added: 'distinct_customers' (a HyperLogLog estimate),
+    'percentiles' mapping each requested q to its value, and 'error_bounds'
+    with the median/percentile rank error, the distinct customer relative
+    standard error and the most any top_customers total can be low by.
+    Sketches from several chunks or processes can be merged with
+    SalesSketch.merge before summarizing.
+    """
+    print("Analyzing sales data (streaming)...")
+    
+    if not sketch.rows:
+        print("No data to analyze")
+        return {}
+    
+    moments = sketch.moments
+    region_sales = sketch.region_sales.sort_index()
+    products = sketch.products.sort_index()
+    top_products = products.iloc[np.argsort(-products['revenue'].to_numpy(), kind='stable')[:5]]
+    
+    print(f"Total Revenue: ${moments.total:,.2f}")
+    print(f"Transactions Analyzed: {sketch.rows}\n")
+    
+    return {
+        'total_revenue': moments.total,
+        'transaction_count': sketch.rows,
+        'avg_transaction': moments.mean if moments.count else np.nan,
+        'median_transaction': sketch.quantiles.quantile(0.5),
+        'std_dev': moments.std(),
+        'min_transaction': moments.min if moments.count else np.nan,
+        'max_transaction': moments.max if moments.count else np.nan,
+        'total_units': sketch.units,
+        'region_sales': region_sales.to_dict(),
+        'top_customers': sketch.customer_spend.top(5),
+        'top_products': [(product, {'revenue': revenue, 'units': units})
+                         for product, revenue, units in zip(top_products.index,
+                                                            top_products['revenue'],
+                                                            top_products['units'])],
+        'distinct_customers': sketch.customers.estimate(),
+        'percentiles': {q: sketch.quantiles.quantile(q) for q in percentiles},
+        'error_bounds': {
+            'percentile_rank': sketch.quantiles.rank_error,
+            'distinct_customers': sketch.customers.relative_error,
+            'top_customers': sketch.customer_spend.error
+        }
+    }
+
+
+def analyze_sales_stream(frames, percentiles=STREAM_PERCENTILES, k=QUANTILE_SKETCH_K,
+                         precision=HLL_PRECISION, capacity=HEAVY_HITTERS_CAPACITY):
+    """
+    Approximate analyze_sales over chunks of validated sales data
+    
+    frames is any iterable of DataFrames, e.g.
+        (validate_and_clean(chunk)[0] for chunk in read_sales_data_frames(path))
+    Only one chunk is in memory at a time; the statistics are kept in a
+    SalesSketch (see utils/sketches.py for the error bounds).
+    """
+    sketch = SalesSketch(k, precision, capacity)
+    for frame in frames:
+        sketch.update(frame)
+    return summarize_sales_sketch(sketch, percentiles)
@@ -1,3 +1,142 @@
+import bz2
+import codecs
+import gzip
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import pyarrow  # optional: Parquet and Arrow IPC output
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard  # optional: .zst files
+except ImportError:
+    zstandard = None
+
+from utils.transaction_table import (
+    NUMERIC_COLUMNS,
+    PLAIN_COLUMNS,
+    TransactionTable,
+    TransactionTableBuilder
+)
+
+
+# Candidate encodings, most specific first (latin-1 decodes any byte)
+ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+
+# Number of bytes inspected when sniffing a file's encoding
+ENCODING_SAMPLE_SIZE = 65536
+
+# Column order of the pipe-delimited sales files
+TRANSACTION_FIELDS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+                      'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+
+_FIELD_INDEX = {name: i for i, name in enumerate(TRANSACTION_FIELDS)}
+
+# Longest field the memory-mapped reader gathers into fixed-width arrays
+MAPPED_FIELD_WIDTH = 64
+
+# Compression applied by file extension when reading and writing
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+_decode_errors = threading.local()
+
+
+def _count_undecodable(error):
+    """Codec error handler that drops undecodable bytes and counts them"""
+    _decode_errors.count = getattr(_decode_errors, 'count', 0) + (error.end - error.start)
+    return ('', error.end)
+
+
+codecs.register_error('count_undecodable', _count_undecodable)
+
+
+def reset_undecodable_count():
+    """Reset the undecodable byte counter for the current thread"""
+    _decode_errors.count = 0
+
+
+def get_undecodable_count():
+    """Number of bytes dropped by the 'count_undecodable' handler since the last reset"""
+    return getattr(_decode_errors, 'count', 0)
+
+
+def _add_undecodable_count(count):
+    """Add bytes dropped elsewhere (e.g. in worker processes) to this thread's count"""
+    _decode_errors.count = get_undecodable_count() + count
+
+
+def compression_of(filename):
+    """Compression named by a file's extension ('gzip', 'bz2', 'xz', 'zstd') or None"""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def format_extension(filename):
+    """Extension naming a file's format, ignoring a compression suffix ('a.csv.gz' -> '.csv')"""
+    if compression_of(filename):
+        filename = os.path.splitext(filename)[0]
+    return os.path.splitext(filename)[1].lower()
+
+
+def open_data_file(filename, mode='rb', encoding=None, errors=None, buffering=-1):
+    """
+    Opens a file like open(), compressing or decompressing by extension
+    
+    .gz, .bz2 and .xz (and .zst when the zstandard package is installed)
+    are streamed through their codec, so no uncompressed copy is written.
+    Raises ValueError for a .zst file without zstandard.
+    """
+    compression = compression_of(filename)
+    if compression is None:
+        return open(filename, mode, buffering=buffering, encoding=encoding, errors=errors)
+
+    # Compressed openers default to binary; ask for text explicitly
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    text_options = {'encoding': encoding, 'errors': errors} if 't' in mode else {}
+
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError(f"'{filename}' is zstd-compressed but zstandard is not installed")
+        return zstandard.open(filename, mode, **text_options)
+
+    opener = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}[compression]
+    return opener(filename, mode, **text_options)
+
+
+def detect_encoding(filename, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Picks the encoding of a file by inspecting a bounded prefix once
+    Returns: name of the first encoding in ENCODINGS that decodes the prefix
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    with open_data_file(filename, 'rb') as file:
+        sample = file.read(sample_size)
+
+    # A multi-byte character may be cut off at the end of the sample
+    is_complete = len(sample) < sample_size
+
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+        try:
+            decoder.decode(sample, final=is_complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    return ENCODINGS[-1]
+
+
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues
@@ -8,78 +147,136 @@ def read_sales_data(filename):
     
     Requirements:
     - Use 'with' statement
-    - Handle different encodings (try 'utf-8', 'latin-1', 'cp1252')
+    - Handle different encodings (sniffed once from the start of the file)
     - Handle FileNotFoundError with appropriate error message
     - Skip the header row
     - Remove empty lines
     """
     
-    # List of encodings to try
-    encodings = ['utf-8', 'latin-1', 'cp1252']
     raw_lines = []
     
-    # Try each encoding until one works
-    for encoding in encodings:
-        try:
-            print(f"Attempting to read file with {encoding} encoding...")
+    try:
+        # Pick the encoding from a prefix of the file instead of re-reading per codec
+        encoding = detect_encoding(filename)
+        print(f"Detected {encoding} encoding")
+        
+        reset_undecodable_count()
+        
+        with open_data_file(filename, 'r', encoding=encoding, errors='count_undecodable') as file:
+            # Skip the header (first line)
+            next(file, None)
             
-            with open(filename, 'r', encoding=encoding, errors='ignore') as file:
-                # Read all lines from file
-                all_lines = file.readlines()
-                
-                # Skip the header (first line)
-                data_lines = all_lines[1:]
-                
-                # Process each line
-                for line in data_lines:
-                    # Remove leading/trailing whitespace and newlines
-                    cleaned_line = line.strip()
-                    
-                    # Skip empty lines
-                    if cleaned_line:
-                        raw_lines.append(cleaned_line)
+            # Process each line
+            for line in file:
+                # Remove leading/trailing whitespace and newlines
+                cleaned_line = line.strip()
                 
-                print(f"Successfully read file using {encoding} encoding")
-                print(f"Total lines read: {len(raw_lines)}\n")
-                
-                # If we got here, reading was successful
-                return raw_lines
+                # Skip empty lines
+                if cleaned_line:
+                    raw_lines.append(cleaned_line)
         
-        except FileNotFoundError:
-            # File doesn't exist - print error and stop trying
-            print(f"ERROR: File '{filename}' not found!")
-            print(f"Please make sure the file exists in the correct location.")
-            return []
+        print(f"Successfully read file using {encoding} encoding")
+        print(f"Total lines read: {len(raw_lines)}")
+        print(f"Undecodable bytes dropped: {get_undecodable_count()}\n")
         
-        except Exception as e:
-            # This encoding didn't work, try next one
-            print(f"Failed with {encoding}: {e}")
-            continue
+        return raw_lines
+    
+    except FileNotFoundError:
+        # File doesn't exist
+        print(f"ERROR: File '{filename}' not found!")
+        print(f"Please make sure the file exists in the correct location.")
+        return []
     
-    # If all encodings failed
-    print("ERROR: Could not read file with any encoding")
-    return []
+    except Exception as e:
+        print(f"ERROR: Could not read file: {e}")
+        return []
+
 
+# The pandas reader below reuses the name read_sales_data; keep the
+# line-based reader reachable under its own name
+read_sales_data_lines = read_sales_data
 
 import pandas as pd
 
-def read_sales_data(file_path):
+# Schema applied by the pandas readers (read_sales_data, read_sales_data_frames)
+# Low-cardinality text columns are loaded as categoricals (integer codes);
+# CustomerID grows with the customer base, so it stays a string column
+SALES_CATEGORICAL_COLUMNS = ['ProductID', 'ProductName', 'Region']
+
+# Numeric columns are narrowed after reading, but only when every value
+# parsed cleanly; otherwise they are left for validate_and_clean to clean
+SALES_NUMERIC_DTYPES = {'Quantity': 'int32', 'UnitPrice': 'float64'}
+
+SALES_DATE_COLUMN = 'Date'
+SALES_DATE_FORMAT = '%Y-%m-%d'
+
+
+def _apply_sales_schema(df):
+    """Narrow numeric columns and parse the date column where the values allow it"""
+    for name, dtype in SALES_NUMERIC_DTYPES.items():
+        if name not in df or df[name].dtype.kind not in 'iuf':
+            continue
+        values = df[name]
+        if np.dtype(dtype).kind == 'i':
+            limits = np.iinfo(dtype)
+            if values.dtype.kind == 'f' or values.min() < limits.min or values.max() > limits.max:
+                continue
+        df[name] = values.astype(dtype)
+
+    if SALES_DATE_COLUMN in df and not pd.api.types.is_datetime64_any_dtype(df[SALES_DATE_COLUMN]):
+        dates = pd.to_datetime(df[SALES_DATE_COLUMN], format=SALES_DATE_FORMAT, errors='coerce')
+        # Keep the text if any date does not parse, rather than silently losing it
+        if dates.isna().sum() == df[SALES_DATE_COLUMN].isna().sum():
+            df[SALES_DATE_COLUMN] = dates
+
+    return df
+
+
+def _sales_dtypes(columns):
+    """read_csv dtype argument for the categorical columns that will be loaded"""
+    return {name: 'category' for name in SALES_CATEGORICAL_COLUMNS
+            if columns is None or name in columns}
+
+
+def read_sales_data(file_path, columns=None):
     """
     Read sales data file using pandas
+    Binary columnar files (.parquet, .arrow, .feather, .npz) are loaded directly
+    
+    Text files are read with the sales schema: ProductID, ProductName and
+    Region as categoricals, Quantity as int32, UnitPrice as float64 and Date
+    as datetime64 (see _apply_sales_schema).
+    columns: optional list of columns to load (others are never parsed)
     """
     try:
         print(f"Reading file: {file_path}")
         
-        # Read pipe-delimited file
-        df = pd.read_csv(
-            file_path,
-            sep='|',
-            encoding='utf-8',
-            on_bad_lines='skip'
-        )
+        if os.path.splitext(file_path)[1].lower() in COLUMNAR_EXTENSIONS:
+            df = read_columnar(file_path, columns)
+            print(f"Columns found: {list(df.columns)}")
+            print(f"Total records read: {len(df)} (columnar)\n")
+            return df
+        
+        encoding = detect_encoding(file_path)
+        reset_undecodable_count()
+        
+        # Read pipe-delimited file; numbers like 1,916 are parsed while reading.
+        # Decoding goes through the counting handler so bad bytes are reported
+        with open_data_file(file_path, 'r', encoding=encoding, errors='count_undecodable') as file:
+            df = pd.read_csv(
+                file,
+                sep='|',
+                on_bad_lines='skip',
+                thousands=',',
+                usecols=columns,
+                dtype=_sales_dtypes(columns)
+            )
+        df = _apply_sales_schema(df)
         
         print(f"Columns found: {list(df.columns)}")
-        print(f"Total records read: {len(df)}\n")
+        if get_undecodable_count():
+            print(f"WARNING: {get_undecodable_count()} undecodable bytes dropped from '{file_path}'")
+        print(f"Total records read: {len(df)} ({encoding})\n")
         
         return df
     
@@ -91,12 +288,397 @@ def read_sales_data(file_path):
         return pd.DataFrame()
 
 
+def read_sales_data_chunks(filename, chunk_rows=10000, chunk_bytes=None, encoding=None):
+    """
+    Streams sales data from file in fixed-size batches
+    Yields: lists of raw lines (strings), same format as read_sales_data
+
+    A batch is emitted once it holds chunk_rows lines or chunk_bytes bytes
+    (whichever comes first), so memory is bounded by the batch size rather
+    than the file size. The encoding is sniffed from the start of the file
+    unless given. Compressed files (see open_data_file) are decompressed as
+    they are read; chunk_bytes then counts decompressed bytes.
+
+    Usage:
+        for raw_lines in read_sales_data_chunks('data/sales_data.txt', chunk_rows=50000):
+            transactions = parse_transactions(raw_lines)
+    """
+    if not chunk_rows and not chunk_bytes:
+        raise ValueError("Either chunk_rows or chunk_bytes must be set")
+
+    try:
+        if encoding is None:
+            encoding = detect_encoding(filename)
+        file = open_data_file(filename, 'rb')
+    except FileNotFoundError:
+        print(f"ERROR: File '{filename}' not found!")
+        return
+
+    reset_undecodable_count()
+
+    with file:
+        # Skip the header (first line)
+        file.readline()
+
+        batch = []
+        batch_bytes = 0
+
+        for raw in file:
+            batch_bytes += len(raw)
+            cleaned_line = raw.decode(encoding, errors='count_undecodable').strip()
+
+            # Skip empty lines
+            if cleaned_line:
+                batch.append(cleaned_line)
+
+            if (chunk_rows and len(batch) >= chunk_rows) or \
+               (chunk_bytes and batch_bytes >= chunk_bytes):
+                if batch:
+                    yield batch
+                batch = []
+                batch_bytes = 0
+
+        if batch:
+            yield batch
+
+    if get_undecodable_count():
+        print(f"WARNING: {get_undecodable_count()} undecodable bytes dropped from '{filename}'")
+
+
+def read_sales_data_frames(file_path, chunk_rows=100000, chunk_bytes=None, columns=None):
+    """
+    Streams sales data from file as pandas DataFrames of bounded size
+    Yields: DataFrames with the same columns and schema as read_sales_data
+    columns: optional list of columns to load (others are never parsed)
+
+    pandas only chunks by row count, so a byte budget is converted into
+    rows using the average line length of the first 64 KB of the file.
+    """
+    try:
+        encoding = detect_encoding(file_path)
+
+        if chunk_bytes:
+            with open_data_file(file_path, 'rb') as file:
+                file.readline()
+                sample = file.read(ENCODING_SAMPLE_SIZE)
+            line_count = max(sample.count(b'\n'), 1)
+            avg_line_bytes = max(len(sample) // line_count, 1)
+            chunk_rows = max(chunk_bytes // avg_line_bytes, 1)
+
+        file = open_data_file(file_path, 'r', encoding=encoding, errors='count_undecodable')
+    except FileNotFoundError:
+        print(f"ERROR: File '{file_path}' not found")
+        return
+
+    reset_undecodable_count()
+
+    with file, pd.read_csv(
+        file,
+        sep='|',
+        on_bad_lines='skip',
+        thousands=',',
+        usecols=columns,
+        dtype=_sales_dtypes(columns),
+        chunksize=chunk_rows
+    ) as reader:
+        for chunk in reader:
+            yield _apply_sales_schema(chunk)
+
+    if get_undecodable_count():
+        print(f"WARNING: {get_undecodable_count()} undecodable bytes dropped from '{file_path}'")
+
+
+class MappedRecord(Mapping):
+    """
+    Read-only transaction backed by a memory-mapped file
+
+    Behaves like the dictionaries returned by parse_transactions, but only
+    stores the byte offsets of its fields. A field is decoded (and Quantity /
+    UnitPrice converted) the first time it is accessed.
+    """
+
+    __slots__ = ('_buffer', '_cuts', '_encoding', '_values')
+
+    def __init__(self, buffer, cuts, encoding, values=None):
+        self._buffer = buffer
+        # Positions of the separators around each field: field i is
+        # buffer[cuts[i] + 1:cuts[i + 1]]
+        self._cuts = cuts
+        self._encoding = encoding
+        self._values = values or [None] * len(TRANSACTION_FIELDS)
+
+    def __getitem__(self, key):
+        index = _FIELD_INDEX[key]
+        value = self._values[index]
+
+        if value is None:
+            raw = self._buffer[self._cuts[index] + 1:self._cuts[index + 1]].strip()
+
+            if key == 'Quantity':
+                value = int(raw.replace(b',', b''))
+            elif key == 'UnitPrice':
+                value = float(raw.replace(b',', b''))
+            else:
+                value = raw.decode(self._encoding, errors='count_undecodable')
+
+            self._values[index] = value
+
+        return value
+
+    def __iter__(self):
+        return iter(TRANSACTION_FIELDS)
+
+    def __len__(self):
+        return len(TRANSACTION_FIELDS)
+
+    def __repr__(self):
+        return f"MappedRecord({dict(self)!r})"
+
+
+def _mapped_field(data, buffer, cuts, name):
+    """
+    One field of every row as a NumPy bytes array, not yet stripped
+    Fields up to MAPPED_FIELD_WIDTH bytes are gathered column-wise, one byte
+    position at a time, into a fixed-width 'S' array (which, like any 'S'
+    array, drops trailing NUL bytes); longer fields are sliced row by row.
+    """
+    index = _FIELD_INDEX[name]
+    starts = cuts[:, index] + 1
+    widths = cuts[:, index + 1] - starts
+    width = int(widths.max()) if len(widths) else 0
+
+    if width > MAPPED_FIELD_WIDTH:
+        values = np.empty(len(starts), dtype=object)
+        values[:] = [buffer[start:end] for start, end in
+                     zip(starts.tolist(), cuts[:, index + 1].tolist())]
+        return values
+
+    width = max(width, 1)
+    gathered = np.empty((len(starts), width), dtype=np.uint8)
+    for offset in range(width):
+        gathered[:, offset] = data[np.minimum(starts + offset, len(data) - 1)]
+    # Bytes past the end of a field belong to the next one
+    gathered[np.arange(width) >= widths[:, None]] = 0
+    return gathered.view(f'S{width}').ravel()
+
+
+def _convert_mapped_numbers(field, convert):
+    """
+    Convert a numeric field with commas removed, once per distinct value
+    Returns: tuple (values, valid); values is an object array holding None
+    where valid is False
+    """
+    codes, uniques = pd.factorize(field)
+    converted = []
+    for raw in uniques.tolist():
+        try:
+            converted.append(convert(raw.replace(b',', b'')))
+        except ValueError:
+            converted.append(None)
+
+    values = np.array(converted, dtype=object)
+    valid = np.array([value is not None for value in converted], dtype=bool)
+    return values[codes], valid[codes]
+
+
+class MappedSalesFile:
+    """
+    Pipe-delimited sales file exposed as an iterable of MappedRecord
+
+    The file is memory-mapped and viewed as a NumPy byte array. The offsets
+    of every newline and '|' byte are found in a few whole-buffer passes
+    (np.flatnonzero), which gives the separator positions of every record
+    at once, so no str is built for a line until one of its fields is read.
+    The scan is done once and reused by later iterations and to_table().
+    Records must not be used after the file is closed.
+    """
+
+    def __init__(self, filename, encoding=None, skip_invalid_numbers=True):
+        self.filename = filename
+        self.skip_invalid_numbers = skip_invalid_numbers
+        self.skipped_count = 0
+        self._file = None
+        self._buffer = None
+        self._scanned = None
+
+        if compression_of(filename):
+            raise ValueError(f"Cannot memory-map compressed file '{filename}'; "
+                             f"use read_sales_data_chunks instead")
+
+        try:
+            self.encoding = encoding or detect_encoding(filename)
+            self._file = open(filename, 'rb')
+        except FileNotFoundError:
+            print(f"ERROR: File '{filename}' not found!")
+            return
+
+        # mmap cannot map an empty file
+        if os.fstat(self._file.fileno()).st_size:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan(self):
+        """
+        Separator positions of every well-formed record
+        Returns: tuple (cuts, quantities, unit_prices); cuts is an (n, 9)
+        array whose row holds the positions around each field (see
+        MappedRecord), and the numbers are object arrays converted up front
+        when skip_invalid_numbers is set (else None)
+        """
+        if self._scanned is not None:
+            return self._scanned
+
+        buffer = self._buffer
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        newlines = np.flatnonzero(data == ord('\n'))
+        pipes = np.flatnonzero(data == ord('|'))
+
+        # Data lines follow the header; a last line may lack its newline
+        starts = newlines + 1
+        ends = np.append(newlines[1:], len(data))
+        if len(starts) and starts[-1] == len(data):
+            starts, ends = starts[:-1], ends[:-1]
+        # A '\r' before the newline is not part of the line
+        ends = ends - ((ends > starts) & (data[np.maximum(ends - 1, 0)] == ord('\r')))
+
+        first_pipe = np.searchsorted(pipes, starts)
+        well_formed = np.searchsorted(pipes, ends) - first_pipe == len(TRANSACTION_FIELDS) - 1
+
+        # Blank lines are dropped silently, like read_sales_data
+        skipped_count = sum(1 for start, end in zip(starts[~well_formed].tolist(),
+                                                    ends[~well_formed].tolist())
+                            if buffer[start:end].strip())
+
+        starts, ends, first_pipe = starts[well_formed], ends[well_formed], first_pipe[well_formed]
+        cuts = np.empty((len(starts), len(TRANSACTION_FIELDS) + 1), dtype=np.int64)
+        cuts[:, 0] = starts - 1
+        cuts[:, 1:-1] = pipes[first_pipe[:, None] + np.arange(len(TRANSACTION_FIELDS) - 1)]
+        cuts[:, -1] = ends
+
+        quantities = unit_prices = None
+        if self.skip_invalid_numbers:
+            quantities, valid_quantities = _convert_mapped_numbers(
+                _mapped_field(data, buffer, cuts, 'Quantity'), int)
+            unit_prices, valid_prices = _convert_mapped_numbers(
+                _mapped_field(data, buffer, cuts, 'UnitPrice'), float)
+            keep = valid_quantities & valid_prices
+            if not keep.all():
+                skipped_count += int(np.count_nonzero(~keep))
+                cuts, quantities, unit_prices = cuts[keep], quantities[keep], unit_prices[keep]
+
+        self.skipped_count = skipped_count
+        self._scanned = (cuts, quantities, unit_prices)
+        return self._scanned
+
+    def __iter__(self):
+        buffer = self._buffer
+        if buffer is None:
+            return
+
+        cuts, quantities, unit_prices = self._scan()
+        encoding = self.encoding
+
+        if quantities is None:
+            for row in cuts.tolist():
+                yield MappedRecord(buffer, row, encoding)
+            return
+
+        quantity_index = _FIELD_INDEX['Quantity']
+        price_index = _FIELD_INDEX['UnitPrice']
+        for row, quantity, unit_price in zip(cuts.tolist(), quantities.tolist(), unit_prices.tolist()):
+            values = [None] * len(TRANSACTION_FIELDS)
+            values[quantity_index] = quantity
+            values[price_index] = unit_price
+            yield MappedRecord(buffer, row, encoding, values)
+
+    def to_table(self, columns=None):
+        """
+        The records as a TransactionTable, built column by column from the
+        scanned offsets: each text field is decoded once per distinct value
+        and no per-row record objects are created
+        """
+        columns = [name for name in TRANSACTION_FIELDS if columns is None or name in columns]
+        if self._buffer is None:
+            return TransactionTable.from_record_list([], columns)
+
+        buffer = self._buffer
+        cuts, quantities, unit_prices = self._scan()
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        strings = {}
+        numbers = {}
+        plain = {}
+
+        for name in columns:
+            if name in NUMERIC_COLUMNS:
+                values = quantities if name == 'Quantity' else unit_prices
+                if values is None:
+                    values, valid = _convert_mapped_numbers(_mapped_field(data, buffer, cuts, name),
+                                                            int if name == 'Quantity' else float)
+                    if not valid.all():
+                        raise ValueError(f"Invalid {name} value in '{self.filename}'")
+                numbers[name] = values.astype(NUMERIC_COLUMNS[name])
+                continue
+
+            field = _mapped_field(data, buffer, cuts, name)
+            if name in PLAIN_COLUMNS:
+                plain[name] = np.array([value.strip().decode(self.encoding, errors='count_undecodable')
+                                        for value in field.tolist()], dtype=object)
+                continue
+
+            codes, categories = pd.factorize(field)
+            labels = [value.strip().decode(self.encoding, errors='count_undecodable')
+                      for value in categories.tolist()]
+            if len(set(labels)) < len(labels):
+                # Different bytes gave the same text (padding, undecodable bytes)
+                relabel, labels = pd.factorize(np.array(labels, dtype=object))
+                codes, labels = relabel[codes], labels.tolist()
+            strings[name] = (codes.astype(np.int32), labels)
+
+        # The byte view must go before the file can be closed
+        del data
+        return TransactionTable(strings, numbers, columns, plain)
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._scanned = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_sales_data_mmap(filename, encoding=None, skip_invalid_numbers=True):
+    """
+    Opens a sales file for zero-copy reading
+    Returns: MappedSalesFile, an iterable of lazily decoded transactions
+
+    Records support the same keys as the dictionaries from parse_transactions,
+    so they can be passed directly to the analysis functions. Rows with the
+    wrong number of fields are skipped; with skip_invalid_numbers, rows whose
+    Quantity or UnitPrice do not parse are skipped too (numeric fields are
+    then converted up front, text fields stay undecoded).
+
+    Usage:
+        with read_sales_data_mmap('data/sales_data.txt') as transactions:
+            regions = region_wise_sales(transactions)
+    """
+    print(f"Memory-mapping file: {filename}")
+    return MappedSalesFile(filename, encoding=encoding,
+                           skip_invalid_numbers=skip_invalid_numbers)
+
+
 def write_report(file_path, content):
     """
-    Write text report to file
+    Write text report to file (compressed for .gz/.bz2/.xz/.zst paths)
     """
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with open_data_file(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
         print(f"Saved: {file_path}")
         return True
@@ -105,24 +687,214 @@ def write_report(file_path, content):
         return False
 
 
+# Field separator written for each output file extension
+DELIMITERS = {'.txt': '|', '.csv': ','}
+
+# Rows formatted per batch and the size of each output file's write buffer
+WRITE_BATCH_ROWS = 65536
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+def _column_text(values):
+    """Text of each value in a column; missing values become ''"""
+    text = values.astype(str).to_numpy(dtype=object, copy=True)
+    missing = values.isna().to_numpy()
+    if missing.any():
+        text[missing] = ''
+    return text
+
+
+def _quote_fields(text, sep):
+    """CSV-quote the fields that contain the separator, a quote or a line break"""
+    special = (sep, '"', '\n', '\r')
+    joined = '\x00'.join(text)
+    if not any(char in joined for char in special):
+        return text
+    return [
+        '"' + value.replace('"', '""') + '"' if any(char in value for char in special) else value
+        for value in text
+    ]
+
+
+def write_delimited(df, file_paths, batch_rows=WRITE_BATCH_ROWS):
+    """
+    Write a DataFrame to one or more delimited text files in a single pass
+    file_paths: '.csv' files are comma-separated, anything else pipe-delimited;
+    a .gz/.bz2/.xz/.zst suffix compresses the file (e.g. 'sales.csv.gz')
+
+    Rows are formatted batch_rows at a time: every value is converted to
+    text once, then joined per output format and written with one large
+    buffered write per batch. The files match DataFrame.to_csv(index=False).
+    """
+    seps = [DELIMITERS.get(format_extension(path), '|') for path in file_paths]
+    files = []
+    try:
+        for path in file_paths:
+            files.append(open_data_file(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES))
+
+        header = [str(name) for name in df.columns]
+        for file, sep in zip(files, seps):
+            file.write(sep.join(_quote_fields(header, sep)) + '\n')
+
+        for start in range(0, len(df), batch_rows):
+            batch = df.iloc[start:start + batch_rows]
+            columns = [_column_text(batch[name]) for name in batch.columns]
+
+            for file, sep in zip(files, seps):
+                rows = zip(*[_quote_fields(text, sep) for text in columns])
+                file.write(''.join([sep.join(row) + '\n' for row in rows]))
+    finally:
+        for file in files:
+            file.close()
+
+
+# Binary columnar formats; Parquet and Arrow IPC need pyarrow, .npz only NumPy
+COLUMNAR_EXTENSIONS = ('.parquet', '.arrow', '.feather', '.npz')
+
+# Preferred columnar output extension in this environment
+COLUMNAR_EXTENSION = '.parquet' if pyarrow is not None else '.npz'
+
+
+def _save_npz(file_path, df):
+    """
+    Write a DataFrame to a compressed .npz archive without pickling
+    Numeric, boolean and datetime columns are stored as arrays, other
+    columns dictionary-encoded as int32 codes (-1 = missing) plus text
+    values; categorical columns keep their categories and dtype.
+    """
+    arrays = {'columns': np.array([str(name) for name in df.columns], dtype=str)}
+    for i, name in enumerate(df.columns):
+        values = df[name]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufM':
+            arrays[f'{i}.values'] = values.to_numpy()
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[f'{i}.codes'] = values.cat.codes.to_numpy().astype(np.int32)
+            arrays[f'{i}.categories'] = np.array([str(value) for value in values.cat.categories], dtype=str)
+            arrays[f'{i}.categorical'] = np.array(True)
+        else:
+            codes, categories = pd.factorize(values)
+            arrays[f'{i}.codes'] = codes.astype(np.int32)
+            arrays[f'{i}.categories'] = np.array([str(value) for value in categories], dtype=str)
+    np.savez_compressed(file_path, **arrays)
+
+
+def _read_npz(file_path, columns=None):
+    """Read a DataFrame written by _save_npz"""
+    data = {}
+    with np.load(file_path, allow_pickle=False) as archive:
+        stored = archive['columns'].tolist()
+        for i, name in enumerate(stored):
+            if columns is not None and name not in columns:
+                continue
+            if f'{i}.values' in archive:
+                data[name] = archive[f'{i}.values']
+                continue
+            codes = archive[f'{i}.codes']
+            categories = archive[f'{i}.categories']
+            if f'{i}.categorical' in archive:
+                data[name] = pd.Categorical.from_codes(codes, categories.tolist())
+                continue
+            values = np.append(categories.astype(object), np.nan)[codes]
+            data[name] = pd.Series(values)
+    return pd.DataFrame(data, columns=[name for name in stored if name in data])
+
+
+def save_columnar(file_path, df):
+    """
+    Write a DataFrame to a binary columnar file chosen by its extension
+    Returns: the path written
+
+    Without pyarrow, .parquet/.arrow/.feather paths are written as .npz.
+    """
+    base, extension = os.path.splitext(file_path)
+    extension = extension.lower()
+    
+    if extension != '.npz' and pyarrow is None:
+        print(f"pyarrow not installed - writing {base}.npz instead of {file_path}")
+        file_path, extension = base + '.npz', '.npz'
+    
+    if extension == '.parquet':
+        df.to_parquet(file_path, index=False)
+    elif extension in ('.arrow', '.feather'):
+        df.reset_index(drop=True).to_feather(file_path)
+    else:
+        _save_npz(file_path, df)
+    return file_path
+
+
+def read_columnar(file_path, columns=None):
+    """
+    Read a DataFrame from a .parquet, .arrow/.feather or .npz file
+    columns: optional list of columns to load
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(file_path, columns=columns)
+    if extension in ('.arrow', '.feather'):
+        return pd.read_feather(file_path, columns=columns)
+    return _read_npz(file_path, columns)
+
+
+def write_outputs(df, file_paths):
+    """
+    Write a DataFrame to every path in file_paths
+    Returns: list of the paths written
+
+    Columnar extensions go through save_columnar, all text files share
+    one write_delimited pass.
+    """
+    columnar = {path: save_columnar(path, df) for path in file_paths
+                if os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS}
+    text_paths = [path for path in file_paths if path not in columnar]
+    if text_paths:
+        write_delimited(df, text_paths)
+    return [columnar.get(path, path) for path in file_paths]
+
+
 def save_cleaned_data(file_path, df):
     """
     Save DataFrame to pipe-delimited file
+    file_path may also be a list of paths: '.csv' paths are written
+    comma-separated from the same formatting pass, and columnar extensions
+    (see COLUMNAR_EXTENSIONS) as binary files
     """
+    file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
     try:
-        df.to_csv(file_path, sep='|', index=False, encoding='utf-8')
-        print(f"Saved: {file_path}")
+        for path in write_outputs(df, file_paths):
+            print(f"Saved: {path}")
         return True
     except Exception as e:
         print(f"ERROR saving data: {e}")
         return False
 
 
-def parse_transactions(raw_lines):
+def _build_transaction(fields):
+    """
+    Builds one transaction dictionary from the 8 split fields of a line
+    Raises ValueError if Quantity or UnitPrice cannot be converted
+    """
+    # Commas inside ProductName are kept as-is
+    return {
+        'TransactionID': fields[0].strip(),
+        'Date': fields[1].strip(),
+        'ProductID': fields[2].strip(),
+        'ProductName': fields[3].strip(),
+        # Remove commas from numeric fields and convert to proper types
+        'Quantity': int(fields[4].strip().replace(',', '')),
+        'UnitPrice': float(fields[5].strip().replace(',', '')),
+        'CustomerID': fields[6].strip(),
+        'Region': fields[7].strip()
+    }
+
+
+def parse_transactions(raw_lines, as_table=False):
     """
     Parses raw lines into clean list of dictionaries
     
-    Returns: list of dictionaries with keys:
+    With as_table=True the rows are appended straight into a columnar
+    TransactionTable instead of being kept as dictionaries.
+    
+    Returns: list of dictionaries (or TransactionTable) with keys:
     ['TransactionID', 'Date', 'ProductID', 'ProductName',
      'Quantity', 'UnitPrice', 'CustomerID', 'Region']
     
@@ -151,12 +923,10 @@ def parse_transactions(raw_lines):
     """
     
     transactions = []
+    builder = TransactionTableBuilder() if as_table else None
+    parsed_count = 0
     skipped_count = 0
     
-    # Define expected column headers
-    headers = ['TransactionID', 'Date', 'ProductID', 'ProductName', 
-               'Quantity', 'UnitPrice', 'CustomerID', 'Region']
-    
     print("Parsing transactions...")
     
     for line_num, line in enumerate(raw_lines, 1):
@@ -170,42 +940,7 @@ def parse_transactions(raw_lines):
             continue
         
         try:
-            # Extract fields
-            transaction_id = fields[0].strip()
-            date = fields[1].strip()
-            product_id = fields[2].strip()
-            product_name = fields[3].strip()
-            quantity_str = fields[4].strip()
-            unit_price_str = fields[5].strip()
-            customer_id = fields[6].strip()
-            region = fields[7].strip()
-            
-            # Handle commas in ProductName
-            # Replace commas with spaces or keep them (business decision)
-            # Here we'll keep the comma but you could replace with: product_name.replace(',', ' ')
-            product_name_clean = product_name
-            
-            # Remove commas from Quantity and convert to int
-            quantity_clean = quantity_str.replace(',', '')
-            quantity = int(quantity_clean)
-            
-            # Remove commas from UnitPrice and convert to float
-            unit_price_clean = unit_price_str.replace(',', '')
-            unit_price = float(unit_price_clean)
-            
-            # Create transaction dictionary
-            transaction = {
-                'TransactionID': transaction_id,
-                'Date': date,
-                'ProductID': product_id,
-                'ProductName': product_name_clean,
-                'Quantity': quantity,
-                'UnitPrice': unit_price,
-                'CustomerID': customer_id,
-                'Region': region
-            }
-            
-            transactions.append(transaction)
+            transaction = _build_transaction(fields)
         
         except ValueError as e:
             # Conversion to int or float failed
@@ -218,14 +953,260 @@ def parse_transactions(raw_lines):
             print(f"  Skipping line {line_num}: Unexpected error - {e}")
             skipped_count += 1
             continue
+        
+        if builder is not None:
+            builder.append(transaction)
+        else:
+            transactions.append(transaction)
+        parsed_count += 1
     
     print(f"\nParsing complete:")
-    print(f"  Successfully parsed: {len(transactions)} transactions")
+    print(f"  Successfully parsed: {parsed_count} transactions")
     print(f"  Skipped: {skipped_count} lines\n")
     
+    if builder is not None:
+        return builder.build()
     return transactions
 
 
+# Target size of one byte-range shard for parse_transactions_parallel
+SHARD_BYTES = 64 * 1024 * 1024
+
+
+def _shard_byte_ranges(filename, shards):
+    """
+    Splits the data part of a file (after the header) into newline-aligned byte ranges
+    Returns: list of (start, end) offsets; every range begins at a line start
+    """
+    size = os.path.getsize(filename)
+
+    with open(filename, 'rb') as file:
+        # Skip the header (first line)
+        file.readline()
+        data_start = file.tell()
+        bounds = [data_start]
+
+        for i in range(1, shards):
+            target = data_start + (size - data_start) * i // shards
+            if target <= bounds[-1]:
+                continue
+
+            # Move to the start of the first line beginning at or after target
+            file.seek(target - 1)
+            file.readline()
+            position = file.tell()
+
+            if bounds[-1] < position < size:
+                bounds.append(position)
+
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def parse_byte_range(filename, start, end, encoding='utf-8', as_table=False):
+    """
+    Parses the lines in bytes [start, end) of a sales file, without printing
+    Returns: tuple (transactions, skipped_count); transactions is a
+    TransactionTable when as_table is set
+
+    start must be the beginning of a line (and past the header); a line cut
+    off at end is parsed as it stands. Lines are split only at newlines and
+    stripped, like read_sales_data_chunks does (str.splitlines would also
+    split inside a line at characters such as U+001C or U+2028).
+    """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding, errors='count_undecodable')
+
+    return _parse_lines([line.strip() for line in text.split('\n')], as_table)
+
+
+def _parse_lines(lines, as_table=False):
+    """
+    Parses data lines by parse_transactions' rules, without printing
+    Returns: tuple (transactions, skipped_count)
+    """
+    builder = TransactionTableBuilder() if as_table else None
+    transactions = []
+    skipped_count = 0
+
+    for line in lines:
+        if not line.strip():
+            continue
+
+        fields = line.split('|')
+        if len(fields) != len(TRANSACTION_FIELDS):
+            skipped_count += 1
+            continue
+
+        try:
+            transaction = _build_transaction(fields)
+        except ValueError:
+            skipped_count += 1
+            continue
+
+        if builder is not None:
+            builder.append(transaction)
+        else:
+            transactions.append(transaction)
+
+    if builder is not None:
+        return builder.build(), skipped_count
+    return transactions, skipped_count
+
+
+def _parse_byte_range(task):
+    """
+    Worker for parse_transactions_parallel: parse_byte_range on one shard
+    Returns: tuple (transactions, skipped_count, undecodable_count); the
+    byte count would otherwise stay in the worker process.
+    Tables are far cheaper than lists of dicts to send back to the parent
+    """
+    reset_undecodable_count()
+    transactions, skipped_count = parse_byte_range(*task)
+    return transactions, skipped_count, get_undecodable_count()
+
+
+def parse_transactions_parallel(filename, workers=None, shard_bytes=SHARD_BYTES, encoding=None,
+                                as_table=False):
+    """
+    Reads and parses a sales file in parallel worker processes
+    Returns: tuple (transactions, shard_skipped_counts)
+
+    The file is split into newline-aligned byte ranges of about shard_bytes
+    (at least one per worker), each range is parsed by parse_transactions'
+    rules in a separate process, and the results are merged in file order.
+    shard_skipped_counts lists the skipped lines per range; bytes that could
+    not be decoded are added up in get_undecodable_count(). With as_table=True
+    the shards are built and merged as a TransactionTable. Compressed files
+    cannot be split by offset; they are decompressed as a stream and parsed
+    chunk by chunk (shard_bytes of decompressed data each) in this process.
+    """
+    try:
+        if encoding is None:
+            encoding = detect_encoding(filename)
+        size = os.path.getsize(filename)
+    except FileNotFoundError:
+        print(f"ERROR: File '{filename}' not found!")
+        return (TransactionTable.from_records([]) if as_table else []), []
+
+    workers = workers or os.cpu_count() or 1
+
+    if compression_of(filename):
+        # No byte offsets to split on: parse decompressed chunks as they stream in
+        print(f"Parsing compressed {filename} in chunks of {shard_bytes} bytes...")
+        results = [_parse_lines(lines, as_table) for lines in
+                   read_sales_data_chunks(filename, chunk_rows=None, chunk_bytes=shard_bytes,
+                                          encoding=encoding)]
+    else:
+        shards = max(workers, -(-size // shard_bytes))
+        tasks = [(filename, start, end, encoding, as_table)
+                 for start, end in _shard_byte_ranges(filename, shards)]
+
+        print(f"Parsing {filename} in {len(tasks)} shards with up to {workers} workers...")
+
+        if workers == 1 or len(tasks) <= 1:
+            results = [_parse_byte_range(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                results = list(executor.map(_parse_byte_range, tasks))
+
+        reset_undecodable_count()
+        _add_undecodable_count(sum(undecodable for _, _, undecodable in results))
+        results = [(shard_transactions, skipped_count)
+                   for shard_transactions, skipped_count, _ in results]
+
+    shard_skipped_counts = [skipped_count for _, skipped_count in results]
+    if as_table:
+        transactions = TransactionTable.concat([table for table, _ in results])
+    else:
+        transactions = []
+        for shard_transactions, _ in results:
+            transactions.extend(shard_transactions)
+
+    print(f"\nParsing complete:")
+    print(f"  Successfully parsed: {len(transactions)} transactions")
+    print(f"  Skipped: {sum(shard_skipped_counts)} lines")
+    print(f"  Undecodable bytes dropped: {get_undecodable_count()}\n")
+
+    return transactions, shard_skipped_counts
+
+
+# Where load_transactions keeps parsed copies of data files
+PARSE_CACHE_DIR = os.path.join('.cache', 'parsed')
+
+
+def _content_hash(filename):
+    """BLAKE2 hash of a file's bytes, read in 1 MB blocks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_transactions(filename, as_table=False, cache_dir=PARSE_CACHE_DIR):
+    """
+    read_sales_data + parse_transactions with an on-disk cache of the result
+    Returns: list of transaction dictionaries (or TransactionTable)
+
+    Parsed rows are stored as a compact TransactionTable .npz keyed on the
+    file's path, size, mtime and content hash. Unchanged size and mtime reuse
+    the cache without reading the file; a changed mtime with the same size
+    falls back to comparing content hashes, so touched-but-identical files
+    are not re-parsed either. Pass cache_dir=None to disable caching.
+    A cache hit with as_table=True only reads the arrays back; a list of
+    dictionaries has to be rebuilt from them, so callers that can work on a
+    TransactionTable should ask for one.
+    """
+    if cache_dir is None:
+        return parse_transactions(read_sales_data_lines(filename), as_table=as_table)
+
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        print(f"ERROR: File '{filename}' not found!")
+        return TransactionTable.from_records([]) if as_table else []
+
+    path = os.path.abspath(filename)
+    cache_file = os.path.join(cache_dir, hashlib.sha256(path.encode('utf-8')).hexdigest()[:24] + '.npz')
+    content_hash = None
+    table = None
+
+    if os.path.exists(cache_file):
+        try:
+            with np.load(cache_file, allow_pickle=False) as archive:
+                meta = json.loads(str(archive['meta']))
+            if meta['path'] == path and meta['size'] == stat.st_size:
+                if meta['mtime_ns'] == stat.st_mtime_ns:
+                    table = TransactionTable.load(cache_file)
+                else:
+                    content_hash = _content_hash(filename)
+                    if content_hash == meta['content_hash']:
+                        table = TransactionTable.load(cache_file)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable cache '{cache_file}': {e}")
+
+    if table is not None:
+        print(f"Loaded {len(table)} parsed transactions from cache: {cache_file}\n")
+    else:
+        table = parse_transactions(read_sales_data_lines(filename), as_table=True)
+
+        meta = {
+            'path': path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': content_hash or _content_hash(filename)
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_file = cache_file + '.tmp'
+        with open(temp_file, 'wb') as f:
+            table.save(f, meta=np.array(json.dumps(meta)))
+        os.replace(temp_file, cache_file)
+
+    return table if as_table else table.to_records()
+
+
 def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
     """
     Validates transactions and applies optional filters
@@ -238,6 +1219,10 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     
     Returns: tuple (valid_transactions, invalid_count, filter_summary)
     
+    All rules and filters are evaluated as NumPy masks over a columnar view
+    of the input. A list of dictionaries gives back a list of the same
+    dictionaries; a TransactionTable gives back a filtered TransactionTable.
+    
     Expected Output Format:
     (
         [list of valid filtered transactions],
@@ -269,66 +1254,64 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     print("VALIDATION AND FILTERING")
     print("=" * 70)
     
+    # Work on a columnar view; every rule and filter below is a boolean mask
+    if isinstance(transactions, TransactionTable):
+        records = None
+        table = transactions
+    else:
+        records = transactions if isinstance(transactions, list) else list(transactions)
+        table = TransactionTable.from_record_list(records)
+    
     # Track counts
-    total_input = len(transactions)
-    invalid_count = 0
+    total_input = len(table)
     filtered_by_region_count = 0
     filtered_by_amount_count = 0
     
+    quantity = table.column('Quantity')
+    unit_price = table.column('UnitPrice')
+    amounts = table.amounts()
+    
+    def string_mask(field, is_bad):
+        # Evaluate the rule once per distinct value, then broadcast by code
+        return table.value_mask(field, is_bad)
+    
     # Step 1: VALIDATION
     print("\nStep 1: Validating transactions...")
-    valid_transactions = []
-    invalid_transactions = []
     
-    for transaction in transactions:
-        is_valid = True
-        reasons = []
-        
-        # Validate Quantity > 0
-        if transaction.get('Quantity', 0) <= 0:
-            is_valid = False
-            reasons.append("Quantity must be > 0")
-        
-        # Validate UnitPrice > 0
-        if transaction.get('UnitPrice', 0) <= 0:
-            is_valid = False
-            reasons.append("UnitPrice must be > 0")
-        
-        # Validate all required fields are present
-        required_fields = ['TransactionID', 'Date', 'ProductID', 'ProductName', 
-                          'Quantity', 'UnitPrice', 'CustomerID', 'Region']
-        for field in required_fields:
-            if not transaction.get(field):
-                is_valid = False
-                reasons.append(f"Missing {field}")
-        
-        # Validate TransactionID starts with 'T'
-        if not str(transaction.get('TransactionID', '')).startswith('T'):
-            is_valid = False
-            reasons.append("TransactionID must start with 'T'")
-        
-        # Validate ProductID starts with 'P'
-        if not str(transaction.get('ProductID', '')).startswith('P'):
-            is_valid = False
-            reasons.append("ProductID must start with 'P'")
-        
-        # Validate CustomerID starts with 'C'
-        if not str(transaction.get('CustomerID', '')).startswith('C'):
-            is_valid = False
-            reasons.append("CustomerID must start with 'C'")
-        
-        if is_valid:
-            valid_transactions.append(transaction)
+    # (mask of failing rows, reason) in the order reasons are reported
+    rules = [
+        (quantity <= 0, "Quantity must be > 0"),
+        (unit_price <= 0, "UnitPrice must be > 0")
+    ]
+    for field in TRANSACTION_FIELDS:
+        if field == 'Quantity':
+            missing = quantity == 0
+        elif field == 'UnitPrice':
+            missing = unit_price == 0
         else:
-            invalid_count += 1
-            invalid_transactions.append({
-                'transaction': transaction,
-                'reasons': reasons
-            })
-            print(f"  Invalid: {transaction.get('TransactionID', 'Unknown')} - {', '.join(reasons)}")
+            missing = string_mask(field, lambda value: not value)
+        rules.append((missing, f"Missing {field}"))
+    rules.append((string_mask('TransactionID', lambda value: not str(value).startswith('T')),
+                  "TransactionID must start with 'T'"))
+    rules.append((string_mask('ProductID', lambda value: not str(value).startswith('P')),
+                  "ProductID must start with 'P'"))
+    rules.append((string_mask('CustomerID', lambda value: not str(value).startswith('C')),
+                  "CustomerID must start with 'C'"))
+    
+    invalid_mask = np.zeros(total_input, dtype=bool)
+    for mask, _ in rules:
+        invalid_mask |= mask
+    valid_mask = ~invalid_mask
+    invalid_count = int(invalid_mask.sum())
+    
+    transaction_ids = table.take(invalid_mask).column('TransactionID')
+    for index, transaction_id in zip(np.flatnonzero(invalid_mask).tolist(), transaction_ids):
+        reasons = [reason for mask, reason in rules if mask[index]]
+        transaction_id = transaction_id or 'Unknown'
+        print(f"  Invalid: {transaction_id} - {', '.join(reasons)}")
     
     print(f"\nValidation Results:")
-    print(f"  Valid: {len(valid_transactions)}")
+    print(f"  Valid: {total_input - invalid_count}")
     print(f"  Invalid: {invalid_count}")
     
     # Step 2: DISPLAY AVAILABLE OPTIONS
@@ -337,25 +1320,21 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     print("-" * 70)
     
     # Get unique regions
-    regions = set()
-    for t in valid_transactions:
-        regions.add(t['Region'])
+    region_names = table.categories('Region')
+    region_codes = table.codes('Region')
+    regions = {region_names[code] for code in np.unique(region_codes[valid_mask]).tolist()}
     
     print(f"\nAvailable Regions: {', '.join(sorted(regions))}")
     
-    # Calculate transaction amounts and find min/max
-    amounts = []
-    for t in valid_transactions:
-        amount = t['Quantity'] * t['UnitPrice']
-        amounts.append(amount)
-    
-    if amounts:
-        min_trans_amount = min(amounts)
-        max_trans_amount = max(amounts)
+    # Transaction amount range, from the amounts computed once above
+    valid_amounts = amounts[valid_mask]
+    if len(valid_amounts):
+        min_trans_amount = valid_amounts.min()
+        max_trans_amount = valid_amounts.max()
         print(f"Transaction Amount Range: ${min_trans_amount:,.2f} - ${max_trans_amount:,.2f}")
     
     # Step 3: APPLY FILTERS
-    filtered_transactions = valid_transactions.copy()
+    keep_mask = valid_mask
     
     # Apply region filter
     if region:
@@ -363,9 +1342,9 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
         print(f"Step 3a: Filtering by Region = '{region}'")
         print("-" * 70)
         
-        before_count = len(filtered_transactions)
-        filtered_transactions = [t for t in filtered_transactions if t['Region'] == region]
-        after_count = len(filtered_transactions)
+        before_count = int(keep_mask.sum())
+        keep_mask = keep_mask & string_mask('Region', lambda value: value == region)
+        after_count = int(keep_mask.sum())
         filtered_by_region_count = before_count - after_count
         
         print(f"  Records before filter: {before_count}")
@@ -383,30 +1362,26 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
         if max_amount is not None:
             print(f"  Maximum amount: ${max_amount:,.2f}")
         
-        before_count = len(filtered_transactions)
+        before_count = int(keep_mask.sum())
         
-        temp_filtered = []
-        for t in filtered_transactions:
-            amount = t['Quantity'] * t['UnitPrice']
-            
-            # Check min_amount
-            if min_amount is not None and amount < min_amount:
-                continue
-            
-            # Check max_amount
-            if max_amount is not None and amount > max_amount:
-                continue
-            
-            temp_filtered.append(t)
+        if min_amount is not None:
+            keep_mask = keep_mask & (amounts >= min_amount)
+        if max_amount is not None:
+            keep_mask = keep_mask & (amounts <= max_amount)
         
-        filtered_transactions = temp_filtered
-        after_count = len(filtered_transactions)
+        after_count = int(keep_mask.sum())
         filtered_by_amount_count = before_count - after_count
         
         print(f"  Records before filter: {before_count}")
         print(f"  Records after filter: {after_count}")
         print(f"  Records filtered out: {filtered_by_amount_count}")
     
+    # Hand back the same kind of object that was passed in
+    if records is None:
+        filtered_transactions = table.take(keep_mask)
+    else:
+        filtered_transactions = [records[i] for i in np.flatnonzero(keep_mask).tolist()]
+    
     # Create summary
     filter_summary = {
         'total_input': total_input,
@@ -0,0 +1,421 @@
+"""
+Shared aggregation engine for the sales analysis report
+
+SalesAggregates computes Quantity * UnitPrice once and builds each
+grouping (region, product, customer, day) at most once, so every report
+metric is read from the same per-group totals instead of re-scanning the
+transactions for each function.
+
+The per-group state is mergeable and can be saved to disk, so
+refresh_aggregates can fold newly appended rows of a sales file into the
+totals of earlier runs without rescanning the history.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+
+import numpy as np
+
+from utils.file_handler import compression_of, detect_encoding, parse_byte_range
+from utils.transaction_table import as_transaction_table
+
+
+GROUP_NAMES = ['total', 'regions', 'products', 'customers', 'days']
+
+# Bytes of the start of a data file remembered to detect a replaced file
+FINGERPRINT_BYTES = 4096
+
+
+def top_n(items, n, key):
+    """
+    The n largest items by key in O(N log n)
+    Ties keep their input order, exactly like sorted(..., reverse=True)[:n]
+    """
+    return heapq.nlargest(n, items, key=key)
+
+
+def bottom_n(items, n, key):
+    """
+    The n smallest items by key in O(N log n)
+    Ties keep their input order, exactly like sorted(...)[:n]
+    """
+    return heapq.nsmallest(n, items, key=key)
+
+
+class SalesAggregates:
+    """
+    Per-region, per-product, per-customer and per-day totals
+
+    Built from a TransactionTable, each group is computed on first use and
+    cached. Group state is kept as plain dictionaries in first-seen order:
+        regions:   {region: [total_sales, transaction_count]}
+        products:  {product: [total_quantity, total_revenue]}
+        customers: {customer: [total_spent, purchase_count, set(products)]}
+        days:      {date: [revenue, transaction_count, set(customers)]}
+    """
+
+    def __init__(self, table=None, groups=None):
+        self._table = table
+        self._amounts = None
+        self._groups = groups or {}
+
+    @classmethod
+    def empty(cls):
+        """Aggregates of zero transactions"""
+        return cls(groups={'total': [0.0, 0], 'regions': {}, 'products': {},
+                           'customers': {}, 'days': {}})
+
+    # ------------------------------------------------------------------
+    # Merging and persistence
+    # ------------------------------------------------------------------
+
+    def merge(self, other):
+        """
+        Fold the totals of other into this object (e.g. newly appended rows)
+        Returns: self
+        """
+        for name in GROUP_NAMES:
+            mine = getattr(self, name)
+            theirs = getattr(other, name)
+
+            if name == 'total':
+                mine[0] += theirs[0]
+                mine[1] += theirs[1]
+                continue
+
+            for key, values in theirs.items():
+                current = mine.get(key)
+                if current is None:
+                    mine[key] = [v.copy() if isinstance(v, set) else v for v in values]
+                    continue
+                current[0] += values[0]
+                current[1] += values[1]
+                if len(values) > 2:
+                    current[2] |= values[2]
+
+        self._table = None
+        self._groups.pop('customer_spend', None)
+        self._groups.pop('day_totals', None)
+        return self
+
+    def to_state(self):
+        """JSON-serializable copy of every group"""
+        state = {}
+        for name in GROUP_NAMES:
+            group = getattr(self, name)
+            if name == 'total':
+                state[name] = list(group)
+            else:
+                state[name] = {
+                    key: [sorted(v) if isinstance(v, set) else v for v in values]
+                    for key, values in group.items()
+                }
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild aggregates saved with to_state"""
+        groups = {'total': list(state['total'])}
+        for name in ('regions', 'products'):
+            groups[name] = {key: list(values) for key, values in state[name].items()}
+        for name in ('customers', 'days'):
+            groups[name] = {key: [values[0], values[1], set(values[2])]
+                            for key, values in state[name].items()}
+        return cls(groups=groups)
+
+    # ------------------------------------------------------------------
+    # Group state
+    # ------------------------------------------------------------------
+
+    def _get_amounts(self):
+        if self._amounts is None:
+            self._amounts = self._table.amounts()
+        return self._amounts
+
+    def _group_sums(self, column, values=None):
+        """Dense groups of a column plus per-group row counts and value sums"""
+        groups, labels = self._table.group_codes(column)
+        counts = np.bincount(groups, minlength=len(labels)).tolist()
+        sums = None
+        if values is not None:
+            sums = np.bincount(groups, weights=values, minlength=len(labels)).tolist()
+        return groups, labels, counts, sums
+
+    def _distinct_pairs(self, groups, column):
+        """
+        Distinct (group, value code) pairs as two arrays, sorted by group
+        Each pair is packed into one int64 key, so a 1-D sort finds them
+        (plain np.sort: np.unique takes a much slower hashing path here)
+        """
+        value_count = max(len(self._table.categories(column)), 1)
+        keys = np.sort(groups.astype(np.int64) * value_count + self._table.codes(column))
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+        return keys // value_count, keys % value_count
+
+    @property
+    def total(self):
+        """[total_revenue, transaction_count]"""
+        if 'total' not in self._groups:
+            amounts = self._get_amounts()
+            self._groups['total'] = [float(amounts.sum()), len(amounts)]
+        return self._groups['total']
+
+    @property
+    def regions(self):
+        if 'regions' not in self._groups:
+            _, labels, counts, sales = self._group_sums('Region', self._get_amounts())
+            self._groups['regions'] = {
+                region: [sales[i], counts[i]] for i, region in enumerate(labels)
+            }
+        return self._groups['regions']
+
+    @property
+    def products(self):
+        if 'products' not in self._groups:
+            groups, labels, _, revenue = self._group_sums('ProductName', self._get_amounts())
+            quantities = self._table.column('Quantity')
+            quantity = np.bincount(groups, weights=quantities, minlength=len(labels))
+            # Fractional quantities keep their float64 sums; whole ones stay ints
+            if np.issubdtype(quantities.dtype, np.integer):
+                quantity = quantity.astype(np.int64)
+            quantity = quantity.tolist()
+            self._groups['products'] = {
+                product: [quantity[i], revenue[i]] for i, product in enumerate(labels)
+            }
+        return self._groups['products']
+
+    @property
+    def customers(self):
+        if 'customers' not in self._groups:
+            groups, labels, counts, spent = self._group_sums('CustomerID', self._get_amounts())
+            products = np.asarray(self._table.categories('ProductName'), dtype=object)
+            custs, codes = self._distinct_pairs(groups, 'ProductName')
+            # Pairs are sorted by customer: one slice of product codes per customer
+            bounds = np.searchsorted(custs, np.arange(len(labels) + 1))
+            names = products[codes].tolist()
+            bought = [set(names[bounds[i]:bounds[i + 1]]) for i in range(len(labels))]
+            self._groups['customers'] = {
+                cust: [spent[i], counts[i], bought[i]] for i, cust in enumerate(labels)
+            }
+        return self._groups['customers']
+
+    @property
+    def customer_spend(self):
+        """{customer: total_spent}, without building the per-customer product sets"""
+        if 'customers' in self._groups:
+            return {cust: totals[0] for cust, totals in self._groups['customers'].items()}
+        if 'customer_spend' not in self._groups:
+            _, labels, _, spent = self._group_sums('CustomerID', self._get_amounts())
+            self._groups['customer_spend'] = dict(zip(labels, spent))
+        return self._groups['customer_spend']
+
+    @property
+    def days(self):
+        if 'days' not in self._groups:
+            groups, labels, counts, revenue = self._group_sums('Date', self._get_amounts())
+            customers = np.asarray(self._table.categories('CustomerID'), dtype=object)
+            days, codes = self._distinct_pairs(groups, 'CustomerID')
+            bounds = np.searchsorted(days, np.arange(len(labels) + 1))
+            names = customers[codes].tolist()
+            seen = [set(names[bounds[i]:bounds[i + 1]]) for i in range(len(labels))]
+            self._groups['days'] = {
+                date: [revenue[i], counts[i], seen[i]] for i, date in enumerate(labels)
+            }
+        return self._groups['days']
+
+    @property
+    def day_totals(self):
+        """{date: [revenue, transaction_count, unique_customers]}, without the customer sets"""
+        if 'days' in self._groups:
+            return {date: [revenue, count, len(customers)]
+                    for date, (revenue, count, customers) in self._groups['days'].items()}
+        if 'day_totals' not in self._groups:
+            groups, labels, counts, revenue = self._group_sums('Date', self._get_amounts())
+            days, _ = self._distinct_pairs(groups, 'CustomerID')
+            unique_customers = np.bincount(days, minlength=len(labels)).tolist()
+            self._groups['day_totals'] = {
+                date: [revenue[i], counts[i], unique_customers[i]] for i, date in enumerate(labels)
+            }
+        return self._groups['day_totals']
+
+    # ------------------------------------------------------------------
+    # Report metrics (same results as the analysis_standalone functions)
+    # ------------------------------------------------------------------
+
+    def total_revenue(self):
+        return self.total[0]
+
+    def region_wise_sales(self):
+        region_data = {
+            region: {'total_sales': sales, 'transaction_count': count}
+            for region, (sales, count) in self.regions.items()
+        }
+
+        grand_total = sum(d['total_sales'] for d in region_data.values())
+
+        for region in region_data:
+            pct = (region_data[region]['total_sales'] / grand_total * 100) if grand_total > 0 else 0
+            region_data[region]['percentage'] = round(pct, 2)
+
+        return dict(sorted(region_data.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+    def product_totals(self):
+        """List of (product, total_quantity, total_revenue) in first-seen order"""
+        return [(product, qty, revenue) for product, (qty, revenue) in self.products.items()]
+
+    def top_selling_products(self, n=5):
+        return top_n(self.product_totals(), n, key=lambda x: x[1])
+
+    def customer_analysis(self):
+        customer_data = {}
+        for cust, (spent, count, products) in self.customers.items():
+            customer_data[cust] = {
+                'total_spent': spent,
+                'purchase_count': count,
+                'products_bought': sorted(products),
+                'avg_order_value': round(spent / count, 2) if count > 0 else 0.0
+            }
+        return dict(sorted(customer_data.items(), key=lambda x: x[1]['total_spent'], reverse=True))
+
+    def top_customers(self, n=5):
+        """List of the n (customer, total_spent) pairs with the highest spend"""
+        return top_n(self.customer_spend.items(), n, key=lambda x: x[1])
+
+    def daily_sales_trend(self):
+        result = {}
+        for date, (revenue, count, unique_customers) in self.day_totals.items():
+            result[date] = {
+                'revenue': round(revenue, 2),
+                'transaction_count': count,
+                'unique_customers': unique_customers
+            }
+        return dict(sorted(result.items()))
+
+    def find_peak_sales_day(self):
+        daily_trend = self.daily_sales_trend()
+
+        if not daily_trend:
+            return (None, 0.0, 0)
+
+        peak_date = max(daily_trend.items(), key=lambda x: x[1]['revenue'])
+        return (peak_date[0], peak_date[1]['revenue'], peak_date[1]['transaction_count'])
+
+    def low_performing_products(self, threshold=10, n=None):
+        low_performers = [p for p in self.product_totals() if p[1] < threshold]
+        if n is not None:
+            return bottom_n(low_performers, n, key=lambda x: x[1])
+        low_performers.sort(key=lambda x: x[1])
+        return low_performers
+
+
+def sales_aggregates(transactions, columns=None):
+    """
+    Return SalesAggregates for transactions (passed through if already aggregated)
+    columns: the columns needed when raw transactions have to be converted
+    """
+    if isinstance(transactions, SalesAggregates):
+        return transactions
+    return SalesAggregates(as_transaction_table(transactions, columns))
+
+
+def _file_fingerprint(filename, length):
+    """Hash of the first length bytes of a file"""
+    with open(filename, 'rb') as file:
+        return hashlib.sha256(file.read(length)).hexdigest()
+
+
+def _last_line_end(file, offset, size):
+    """Position just after the last newline at or after offset (offset if none)"""
+    end = size
+    while end > offset:
+        start = max(offset, end - 65536)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b'\n')
+        if newline != -1:
+            return start + newline + 1
+        end = start
+    return offset
+
+
+def refresh_aggregates(data_file, state_file, validate=None):
+    """
+    Bring saved aggregates up to date with rows appended to a sales file
+    Returns: SalesAggregates over every record of data_file
+
+    The state file records how far into data_file the totals reach. Only the
+    complete lines after that offset are parsed (validate, if given, takes
+    and returns a TransactionTable), merged into the saved totals and saved
+    back. A last line without a newline that still parses as a full record
+    is added to the returned totals but not saved, since a writer may still
+    be appending to it; it is read again on the next run. If the file was
+    truncated or its start has changed, the totals are rebuilt from the
+    beginning. Compressed files have no appendable byte offsets and raise
+    ValueError.
+    """
+    if compression_of(data_file):
+        raise ValueError(f"Cannot refresh totals incrementally from compressed file '{data_file}'")
+
+    size = os.path.getsize(data_file)
+    aggregates = None
+    offset = 0
+
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        source = saved['source']
+        fingerprint_length = min(source['offset'], FINGERPRINT_BYTES)
+
+        if (source['offset'] <= size and
+                _file_fingerprint(data_file, fingerprint_length) == source['fingerprint']):
+            aggregates = SalesAggregates.from_state(saved['aggregates'])
+            offset = source['offset']
+        else:
+            print(f"'{data_file}' no longer matches '{state_file}' - rebuilding totals")
+
+    with open(data_file, 'rb') as file:
+        if aggregates is None:
+            aggregates = SalesAggregates.empty()
+            # Skip the header (first line)
+            file.readline()
+            offset = file.tell()
+
+        # Only consume complete lines; a partially written last line waits for the next run
+        end = _last_line_end(file, offset, size)
+
+    encoding = detect_encoding(data_file)
+    if end > offset:
+        table, skipped_count = parse_byte_range(data_file, offset, end, encoding, as_table=True)
+        if validate is not None:
+            table = validate(table)
+        aggregates.merge(SalesAggregates(table))
+        print(f"Aggregated {len(table)} new transactions ({skipped_count} lines skipped)")
+        offset = end
+    else:
+        print("No new transactions to aggregate")
+
+    state = {
+        'source': {
+            'path': os.path.abspath(data_file),
+            'offset': offset,
+            'fingerprint': _file_fingerprint(data_file, min(offset, FINGERPRINT_BYTES))
+        },
+        'aggregates': aggregates.to_state()
+    }
+
+    # Write to a temporary file first so an interrupted run keeps the old state
+    temp_file = state_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_file, state_file)
+
+    if size > end:
+        table, skipped_count = parse_byte_range(data_file, end, size, encoding, as_table=True)
+        if validate is not None:
+            table = validate(table)
+        if len(table):
+            aggregates.merge(SalesAggregates(table))
+            print(f"Included {len(table)} transactions from the unterminated last line")
+
+    return aggregates
@@ -0,0 +1,336 @@
+"""
+Mergeable summaries for sales statistics over data that does not fit in memory
+
+Each sketch is fed one chunk at a time with update() and can be combined
+with another sketch of the same kind with merge(), so chunks read by one
+process, or by several processes (sketches pickle), give the same kind of
+answer as one pass over all the data:
+
+    MomentSketch         count, sum, mean, variance, min, max (exact up to
+                         float rounding, Welford/Chan pairwise updates)
+    QuantileSketch       median and percentiles (KLL); exact until the first
+                         compaction, then a rank error within 4 / k of the
+                         count (1% at the default k=400)
+    DistinctCountSketch  distinct values (HyperLogLog); relative standard
+                         error 1.04 / sqrt(2 ** precision)
+    HeavyHittersSketch   largest per-key totals (weighted Misra-Gries); each
+                         total is low by at most the reported error, and
+                         exact while the keys fit in its capacity
+
+SalesSketch bundles them with exact per-region and per-product totals for
+the streaming mode of the sales analysis.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+QUANTILE_SKETCH_K = 400
+HLL_PRECISION = 12
+HEAVY_HITTERS_CAPACITY = 4096
+
+
+def _present(values):
+    """Float array of values with missing ones dropped"""
+    values = np.asarray(values, dtype=np.float64).ravel()
+    return values[~np.isnan(values)]
+
+
+class MomentSketch:
+    """
+    Running count, sum, mean, sum of squared deviations, min and max
+
+    Chunks are summarised with NumPy and folded in with Chan's parallel
+    update, which stays numerically stable for large counts.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add an array of values; missing values are skipped"""
+        values = _present(values)
+        if len(values):
+            batch = MomentSketch()
+            batch.count = len(values)
+            batch.total = values.sum()
+            batch.mean = batch.total / batch.count
+            batch.m2 = np.square(values - batch.mean).sum()
+            batch.min = values.min()
+            batch.max = values.max()
+            self.merge(batch)
+        return self
+
+    def merge(self, other):
+        """Fold the moments of other into this sketch"""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self, ddof=0):
+        """Variance of the values seen (population variance by default)"""
+        if self.count <= ddof:
+            return np.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        return np.sqrt(self.variance(ddof))
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch
+
+    Values are kept in levels; an item on level h stands for 2 ** h input
+    values. When a level outgrows its capacity it is sorted and every other
+    item (random offset) is promoted to the next level. Memory is about
+    3 * k items whatever the input size.
+
+    rank_error is 4 / k: over many seeds and streams of thousands of small
+    chunks, the worst rank error seen across the 1st..99th percentiles was
+    about 3.4 / k, in line with published KLL figures (about 1.65% at
+    k=200). The default k=400 keeps percentiles within 1% of the count.
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so weights are preserved
+                keep, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add an array of values; missing values are skipped"""
+        values = _present(values)
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold the items of other into this sketch"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    @property
+    def is_exact(self):
+        """True while no values have been compacted away"""
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self):
+        """Bound on the rank error of quantile(), as a fraction of the count"""
+        return 0.0 if self.is_exact else 4 / self.k
+
+    def quantile(self, q):
+        """
+        Value at quantile q (0..1); NaN for an empty sketch
+        Matches np.quantile exactly while is_exact is True
+        """
+        if not self.count:
+            return np.nan
+        if self.is_exact:
+            return np.quantile(self.levels[0], q)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return items[order][min(position, len(items) - 1)]
+
+
+class DistinctCountSketch:
+    """
+    HyperLogLog distinct counter
+
+    Values are hashed with pandas' stable 64-bit hash (the same in every
+    process), so sketches built in separate processes merge correctly.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Add values (any hashable scalars); missing values are skipped"""
+        values = pd.Series(values, dtype=object).dropna()
+        if values.empty:
+            return self
+
+        hashes = pd.util.hash_array(values.to_numpy())
+        tail_bits = 64 - self.precision
+        index = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+
+        # Position of the leftmost 1 bit in the tail; float exponents can
+        # round up near powers of two, so correct by one where they did
+        bit_length = np.frexp(tail.astype(np.float64))[1].astype(np.int64)
+        rounded_up = (bit_length > 0) & (
+            np.left_shift(np.uint64(1), np.maximum(bit_length - 1, 0).astype(np.uint64)) > tail
+        )
+        bit_length -= rounded_up
+        rank = (tail_bits - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """Fold the registers of other into this sketch"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def relative_error(self):
+        """Relative standard error of the estimate"""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def estimate(self):
+        """Estimated number of distinct values"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * np.log(m / zeros)
+        return raw
+
+
+class HeavyHittersSketch:
+    """
+    Weighted Misra-Gries summary of per-key totals (e.g. spend per customer)
+
+    At most capacity keys are kept. When more are seen, the (capacity+1)-th
+    largest total is subtracted from every total and keys left at zero or
+    below are dropped; the subtracted amounts add up to error, the most by
+    which any kept total can be low. Any key whose true total exceeds error
+    is still kept. Merging two sketches keeps the same guarantee.
+    """
+
+    def __init__(self, capacity=HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.error = 0.0
+        self.totals = pd.Series(dtype=np.float64)
+
+    def update(self, totals):
+        """Add a Series of non-negative amounts indexed by key"""
+        totals = pd.Series(totals.to_numpy(dtype=np.float64), index=totals.index.astype(object))
+        self.totals = self.totals.add(totals, fill_value=0)
+        if len(self.totals) > self.capacity:
+            values = self.totals.to_numpy()
+            threshold = np.partition(values, len(values) - self.capacity - 1)[len(values) - self.capacity - 1]
+            self.totals = self.totals[self.totals > threshold] - threshold
+            self.error += threshold
+        return self
+
+    def merge(self, other):
+        """Fold the totals of other into this sketch"""
+        self.error += other.error
+        return self.update(other.totals)
+
+    def top(self, n):
+        """The n (key, total) pairs with the largest totals; ties keep key order"""
+        totals = self.totals.sort_index()
+        order = np.argsort(-totals.to_numpy(), kind='stable')[:n]
+        return list(zip(totals.index[order], totals.to_numpy()[order]))
+
+
+class SalesSketch:
+    """
+    Mergeable summary of validated sales rows (TotalPrice, Quantity, Region,
+    ProductName, CustomerID)
+
+    Revenue moments and units are exact (units are float64 sums, like
+    analyze_sales, so fractional quantities are kept), median and percentiles come from a
+    QuantileSketch, distinct customers from a DistinctCountSketch and the
+    top customers from a HeavyHittersSketch. Region and product totals are
+    kept exactly; they grow with the number of regions and products, not
+    with the number of rows. The quantile sketch uses a fixed seed by
+    default so the same input gives the same report.
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, precision=HLL_PRECISION,
+                 capacity=HEAVY_HITTERS_CAPACITY, seed=0):
+        self.rows = 0
+        self.units = 0.0
+        self.moments = MomentSketch()
+        self.quantiles = QuantileSketch(k, seed)
+        self.customers = DistinctCountSketch(precision)
+        self.customer_spend = HeavyHittersSketch(capacity)
+        self.region_sales = pd.Series(dtype=np.float64)
+        self.products = pd.DataFrame({'revenue': pd.Series(dtype=np.float64),
+                                      'units': pd.Series(dtype=np.float64)})
+
+    def update(self, df):
+        """Add one chunk of validated sales rows"""
+        if df.empty:
+            return self
+        self.rows += len(df)
+        self.units += float(df['Quantity'].sum())
+        self.moments.update(df['TotalPrice'])
+        self.quantiles.update(df['TotalPrice'])
+        self.customers.update(df['CustomerID'])
+        self.customer_spend.update(df.groupby('CustomerID', observed=True)['TotalPrice'].sum())
+
+        regions = df.groupby('Region', observed=True)['TotalPrice'].sum()
+        self.region_sales = self.region_sales.add(regions, fill_value=0)
+        products = df.groupby('ProductName', observed=True).agg(
+            revenue=('TotalPrice', 'sum'), units=('Quantity', 'sum')
+        ).astype(np.float64)
+        self._add_products(products)
+        return self
+
+    def _add_products(self, products):
+        self.products = self.products.add(products, fill_value=0)
+
+    def merge(self, other):
+        """Fold the summary of other (e.g. another chunk or process) into this one"""
+        self.rows += other.rows
+        self.units += other.units
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.customers.merge(other.customers)
+        self.customer_spend.merge(other.customer_spend)
+        self.region_sales = self.region_sales.add(other.region_sales, fill_value=0)
+        self._add_products(other.products)
+        return self
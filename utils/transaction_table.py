@@ -0,0 +1,385 @@
+"""
+Columnar (struct-of-arrays) storage for sales transactions
+
+A TransactionTable keeps one NumPy array per numeric column and
+dictionary-encodes text columns as integer codes plus a list of distinct
+values, so a row costs a few dozen bytes instead of a dict. TransactionID
+is unique per row and gains nothing from a dictionary, so it is kept as a
+plain object array instead.
+"""
+
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+
+# Column order of the pipe-delimited sales files
+COLUMNS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+           'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+
+STRING_COLUMNS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+                  'CustomerID', 'Region']
+
+# NumPy dtype codes: int64 Quantity, float64 UnitPrice
+NUMERIC_COLUMNS = {'Quantity': 'q', 'UnitPrice': 'd'}
+
+# Text columns with a distinct value per row, stored as plain values rather
+# than codes plus categories
+PLAIN_COLUMNS = ['TransactionID']
+
+# Rows TransactionTableBuilder buffers before converting them column-wise
+BUILDER_BATCH_ROWS = 65536
+
+
+def _factorize(values):
+    """(int32 codes, categories list) of an object array, in order of first appearance"""
+    codes, categories = pd.factorize(values)
+    categories = list(categories)
+    if len(codes) and codes.min() < 0:
+        # Missing values (NaN) are kept as a category of their own
+        missing = codes < 0
+        categories.append(values[np.argmax(missing)])
+        codes[missing] = len(categories) - 1
+    return codes.astype(np.int32), categories
+
+
+def _gather(records, name, default):
+    """One field of every record as a list; missing or empty values become default"""
+    try:
+        values = list(map(itemgetter(name), records))
+    except KeyError:
+        return [record.get(name) or default for record in records]
+    if not all(values):
+        values = [value or default for value in values]
+    return values
+
+
+class TransactionTable:
+    """
+    Sales transactions stored column by column
+
+    String columns are (codes, categories) pairs where categories[codes[i]]
+    is the value of row i; codes are assigned in order of first appearance.
+    Columns in PLAIN_COLUMNS are object arrays of their values instead;
+    they are dictionary-encoded on first use of codes() or categories().
+    Iterating a table yields the same dictionaries as parse_transactions.
+    """
+
+    def __init__(self, strings, numbers, columns=None, plain=None):
+        self._strings = strings
+        self._numbers = numbers
+        self._plain = plain or {}
+        self.columns = list(columns or COLUMNS)
+
+    @classmethod
+    def from_records(cls, records, columns=None):
+        """
+        Build a table from an iterable of transaction dictionaries
+
+        columns limits the table to a subset of COLUMNS; other fields are
+        never read from the records (which keeps lazily decoded records lazy).
+        """
+        builder = TransactionTableBuilder(columns)
+        for record in records:
+            builder.append(record)
+        return builder.build()
+
+    @classmethod
+    def from_record_list(cls, records, columns=None):
+        """
+        Build a table from a list of transaction dictionaries, one column at a time
+
+        Same result as from_records, but only the requested columns are
+        gathered, each in a single pass over the records, and text columns
+        are dictionary-encoded with pandas.factorize instead of a per-row
+        Python loop. Missing values become '' or 0; whole-number floats in
+        an integer column are stored as integers.
+        """
+        columns = [name for name in COLUMNS if columns is None or name in columns]
+        strings = {}
+        numbers = {}
+        plain = {}
+        for name in columns:
+            if name in STRING_COLUMNS:
+                values = np.empty(len(records), dtype=object)
+                values[:] = _gather(records, name, '')
+                if name in PLAIN_COLUMNS:
+                    plain[name] = values
+                else:
+                    strings[name] = _factorize(values)
+            else:
+                values = np.array(_gather(records, name, 0))
+                if values.dtype.kind not in 'iuf':
+                    values = values.astype(np.float64)
+                if values.dtype.kind != 'f':
+                    values = values.astype(NUMERIC_COLUMNS[name], copy=False)
+                elif NUMERIC_COLUMNS[name] != 'd' and np.all(np.isfinite(values) & (values == np.trunc(values))):
+                    # Whole-number floats (2.0) stay in an integer column
+                    values = values.astype(NUMERIC_COLUMNS[name])
+                numbers[name] = values
+        return cls(strings, numbers, columns, plain)
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Append tables into one, merging their categories
+        Every table must have the columns of the first one (e.g. the same projection)
+        """
+        columns = list(tables[0].columns) if tables else list(COLUMNS)
+        string_columns = [name for name in columns
+                          if (tables[0].is_string_column(name) if tables else name in STRING_COLUMNS)]
+
+        strings = {}
+        plain = {}
+        for name in string_columns:
+            if tables and all(name in table._plain for table in tables):
+                plain[name] = np.concatenate([table._plain[name] for table in tables])
+                continue
+
+            lookup = {}
+            parts = []
+            for table in tables:
+                codes, categories = table.codes(name), table.categories(name)
+                remap = np.empty(len(categories), dtype=np.int32)
+                for i, value in enumerate(categories):
+                    code = lookup.get(value)
+                    if code is None:
+                        code = lookup[value] = len(lookup)
+                    remap[i] = code
+                parts.append(remap[codes])
+            merged = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+            strings[name] = (merged.astype(np.int32, copy=False), list(lookup))
+
+        numbers = {}
+        for name in columns:
+            if name in string_columns:
+                continue
+            parts = [table._numbers[name] for table in tables]
+            numbers[name] = np.concatenate(parts) if parts else np.empty(0, dtype=NUMERIC_COLUMNS[name])
+
+        return cls(strings, numbers, columns, plain)
+
+    def __len__(self):
+        for values in self._numbers.values():
+            return len(values)
+        for codes, _ in self._strings.values():
+            return len(codes)
+        for values in self._plain.values():
+            return len(values)
+        return 0
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def __repr__(self):
+        return f"TransactionTable({len(self)} rows, columns={self.columns})"
+
+    def _encode(self, name):
+        """Dictionary-encode a plain column in place"""
+        self._strings[name] = _factorize(self._plain.pop(name))
+
+    def codes(self, name):
+        """Integer codes of a string column"""
+        if name in self._plain:
+            self._encode(name)
+        return self._strings[name][0]
+
+    def categories(self, name):
+        """Distinct values of a string column, indexed by code"""
+        if name in self._plain:
+            self._encode(name)
+        return self._strings[name][1]
+
+    def column(self, name):
+        """Values of a column: a NumPy array for numbers, a list for strings"""
+        if name in self._numbers:
+            return self._numbers[name]
+        if name in self._plain:
+            return self._plain[name].tolist()
+        codes, categories = self._strings[name]
+        return np.asarray(categories, dtype=object)[codes].tolist()
+
+    def is_string_column(self, name):
+        return name in self._strings or name in self._plain
+
+    def value_mask(self, name, predicate):
+        """
+        Boolean mask of the rows whose value in a string column satisfies predicate
+        predicate runs once per distinct value (once per row for plain columns)
+        """
+        if name in self._plain:
+            return np.fromiter(map(predicate, self._plain[name]), dtype=bool, count=len(self))
+        codes, categories = self._strings[name]
+        return np.fromiter(map(predicate, categories), dtype=bool, count=len(categories))[codes]
+
+    def amounts(self):
+        """Quantity * UnitPrice for every row"""
+        return self._numbers['Quantity'] * self._numbers['UnitPrice']
+
+    def group_codes(self, name):
+        """
+        Dense group numbers for a string column
+        Returns: tuple (group_ids, labels)
+
+        Groups are numbered in order of first appearance within this table,
+        which matches the key order of a dict built by a row-by-row loop,
+        even after rows have been removed with take().
+        """
+        codes, categories = self.codes(name), self.categories(name)
+        if not len(codes):
+            return np.empty(0, dtype=np.intp), []
+
+        # First row of each code, in one O(n) pass instead of a sort of all codes
+        first_rows = np.full(len(categories), len(codes), dtype=np.intp)
+        np.minimum.at(first_rows, codes, np.arange(len(codes)))
+        used = np.flatnonzero(first_rows < len(codes))
+        order = used[np.argsort(first_rows[used], kind='stable')]
+        rank = np.empty(len(categories), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+
+        labels = [categories[code] for code in order.tolist()]
+        return rank[codes], labels
+
+    def take(self, selector):
+        """New table with the rows picked by a boolean mask or index array"""
+        strings = {name: (codes[selector], categories)
+                   for name, (codes, categories) in self._strings.items()}
+        numbers = {name: values[selector] for name, values in self._numbers.items()}
+        plain = {name: values[selector] for name, values in self._plain.items()}
+        return TransactionTable(strings, numbers, self.columns, plain)
+
+    def add_string_column(self, name, codes, categories):
+        """Attach a dictionary-encoded column (e.g. enrichment results)"""
+        self._plain.pop(name, None)
+        self._strings[name] = (np.asarray(codes, dtype=np.int32), list(categories))
+        if name not in self.columns:
+            self.columns.append(name)
+
+    def add_numeric_column(self, name, values):
+        """Attach a numeric column"""
+        self._numbers[name] = np.asarray(values)
+        if name not in self.columns:
+            self.columns.append(name)
+
+    def iter_records(self, batch_rows=65536):
+        """Yield rows as dictionaries, decoding batch_rows rows at a time"""
+        lookups = {name: np.asarray(categories, dtype=object)
+                   for name, (codes, categories) in self._strings.items()}
+
+        for start in range(0, len(self), batch_rows):
+            stop = start + batch_rows
+            values = []
+            for name in self.columns:
+                if name in self._strings:
+                    values.append(lookups[name][self._strings[name][0][start:stop]].tolist())
+                elif name in self._plain:
+                    values.append(self._plain[name][start:stop].tolist())
+                else:
+                    values.append(self._numbers[name][start:stop].tolist())
+
+            for row in zip(*values):
+                yield dict(zip(self.columns, row))
+
+    def to_records(self):
+        """All rows as a list of dictionaries"""
+        return list(self.iter_records())
+
+    def save(self, file, **extra_arrays):
+        """
+        Write the table to a NumPy .npz archive (no pickling)
+        extra_arrays are stored alongside, e.g. metadata
+
+        Plain columns are written as newline-terminated UTF-8 text, which
+        takes far less room than a fixed-width string array of unique
+        values; a column whose values contain newlines is encoded instead.
+        """
+        arrays = {'columns': np.array(self.columns, dtype=str)}
+        for name, values in list(self._plain.items()):
+            text = ''.join(map('{}\n'.format, values))
+            if text.count('\n') == len(values):
+                arrays[f'{name}.text'] = np.frombuffer(text.encode('utf-8', 'surrogatepass'),
+                                                       dtype=np.uint8)
+            else:
+                self._encode(name)
+        for name, (codes, categories) in self._strings.items():
+            arrays[f'{name}.codes'] = codes
+            arrays[f'{name}.categories'] = np.array(categories, dtype=str)
+        for name, values in self._numbers.items():
+            arrays[f'{name}.values'] = values
+        arrays.update(extra_arrays)
+        np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, file):
+        """Read a table written by save()"""
+        with np.load(file, allow_pickle=False) as archive:
+            columns = archive['columns'].tolist()
+            strings = {}
+            numbers = {}
+            plain = {}
+            for name in columns:
+                if f'{name}.codes' in archive:
+                    strings[name] = (archive[f'{name}.codes'],
+                                     archive[f'{name}.categories'].tolist())
+                elif f'{name}.text' in archive:
+                    text = archive[f'{name}.text'].tobytes().decode('utf-8', 'surrogatepass')
+                    plain[name] = np.array(text.split('\n')[:-1], dtype=object)
+                else:
+                    numbers[name] = archive[f'{name}.values']
+        return cls(strings, numbers, columns, plain)
+
+
+class TransactionTableBuilder:
+    """
+    Accumulates transactions row by row into a TransactionTable
+
+    Rows are buffered and converted column-wise (from_record_list) every
+    batch_rows rows, so at most one batch is held as dictionaries and each
+    batch is encoded without a per-row Python loop over the columns.
+    """
+
+    def __init__(self, columns=None, batch_rows=BUILDER_BATCH_ROWS):
+        self.columns = [name for name in COLUMNS if columns is None or name in columns]
+        self.batch_rows = batch_rows
+        self._pending = []
+        self._tables = []
+
+    def append(self, transaction):
+        """
+        Add one transaction dictionary; missing values become '' or 0
+        Whole-number floats (2.0) are stored as integers; a fractional value
+        widens its integer column to float64
+        """
+        self._pending.append(transaction)
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._tables.append(TransactionTable.from_record_list(self._pending, self.columns))
+            self._pending = []
+
+    def build(self):
+        """Freeze the accumulated rows into a TransactionTable"""
+        self._flush()
+        if len(self._tables) == 1:
+            return self._tables[0]
+        if not self._tables:
+            return TransactionTable.from_record_list([], self.columns)
+        return TransactionTable.concat(self._tables)
+
+
+def as_transaction_table(transactions, columns=None):
+    """
+    Return transactions as a TransactionTable, converting a list of dicts if needed
+    columns: the columns the caller needs when a conversion happens
+    """
+    if isinstance(transactions, TransactionTable):
+        return transactions
+    if isinstance(transactions, list):
+        return TransactionTable.from_record_list(transactions, columns)
+    if hasattr(transactions, 'to_table'):
+        # e.g. MappedSalesFile, which can build the columns from its offsets
+        return transactions.to_table(columns)
+    return TransactionTable.from_records(transactions, columns)